@@ -78,6 +78,68 @@ class MLService {
     }
   }
 
+  /**
+   * Submit a bulk prediction job
+   * @param {String} type - Job type: 'predict-yield' or 'recommend-crop'
+   * @param {Array} samples - Array of input samples
+   * @returns {Promise<Object>} Job ID and initial status
+   */
+  async submitBulkJob(type, samples) {
+    try {
+      const response = await axios.post(
+        `${this.mlServiceUrl}/api/ml/jobs`,
+        { type, samples },
+        {
+          headers: { 'Content-Type': 'application/json' },
+          timeout: 60000,
+          maxBodyLength: Infinity
+        }
+      );
+
+      return response.data;
+    } catch (error) {
+      console.error('ML Service - Bulk Job Submission Error:', error.message);
+      throw new Error('Failed to submit bulk prediction job.');
+    }
+  }
+
+  /**
+   * Get status and progress of a bulk prediction job
+   * @param {String} jobId - Job ID returned by submitBulkJob
+   * @returns {Promise<Object>} Job status
+   */
+  async getJobStatus(jobId) {
+    try {
+      const response = await axios.get(`${this.mlServiceUrl}/api/ml/jobs/${jobId}`, {
+        timeout: 10000
+      });
+
+      return response.data;
+    } catch (error) {
+      console.error('ML Service - Job Status Error:', error.message);
+      throw new Error('Failed to get bulk prediction job status.');
+    }
+  }
+
+  /**
+   * Stream the results of a succeeded bulk prediction job
+   * @param {String} jobId - Job ID returned by submitBulkJob
+   * @returns {Promise<Stream>} JSON Lines stream, one result per sample
+   */
+  async getJobResults(jobId) {
+    try {
+      const response = await axios.get(`${this.mlServiceUrl}/api/ml/jobs/${jobId}/results`, {
+        responseType: 'stream',
+        timeout: 10000
+      });
+
+      return response.data;
+    } catch (error) {
+      console.error('ML Service - Job Results Error:', error.message);
+      throw new Error('Failed to get bulk prediction job results.');
+    }
+  }
+
   /**
    * Check ML service health
    * @returns {Promise<Boolean>} Service health status
@@ -1,7 +1,7 @@
 """
 Flask ML Service for Crop Yield Prediction and Crop Recommendation
 """
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 import joblib
 import numpy as np
@@ -9,25 +9,67 @@ import pandas as pd
 import os
 from dotenv import load_dotenv
 
+import drift
+import jobs
+import rules
+from compact_forest import load_model
+from profiling import init_profiling
+from uncertainty import INTERVAL_LEVEL, summarize_trees, tree_predictions
+from model_registry import DEFAULT_MEMORY_MB, ModelRegistry
+from serialization import json_response, is_compact
+
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
+# Opt-in request profiling (see profiling.py); no hooks when disabled
+init_profiling(app)
+
 # Load models
 MODEL_DIR = 'models'
 
+# Use compact float32/uint8 forests exported by compact_forest.py when present
+USE_COMPACT_MODELS = os.getenv('ML_COMPACT_MODELS', 'false').lower() == 'true'
+
 # Yield Prediction Models
-yield_model = joblib.load(os.path.join(MODEL_DIR, 'yield_prediction_model.pkl'))
+yield_model = load_model('yield_prediction_model', MODEL_DIR, compact=USE_COMPACT_MODELS)
 yield_scaler = joblib.load(os.path.join(MODEL_DIR, 'yield_scaler.pkl'))
 yield_label_encoders = joblib.load(os.path.join(MODEL_DIR, 'yield_label_encoders.pkl'))
 yield_features = joblib.load(os.path.join(MODEL_DIR, 'yield_feature_names.pkl'))
 
+# Region/crop specialised yield models, loaded on demand with the global
+# model as fallback
+yield_registry = ModelRegistry(
+    {
+        'model': yield_model,
+        'scaler': yield_scaler,
+        'label_encoders': yield_label_encoders,
+        'features': yield_features
+    },
+    memory_budget=int(os.getenv('ML_MODEL_MEMORY_MB', DEFAULT_MEMORY_MB)) * 2 ** 20
+)
+
 # Crop Recommendation Models
-crop_model = joblib.load(os.path.join(MODEL_DIR, 'crop_recommendation_model.pkl'))
+crop_model = load_model('crop_recommendation_model', MODEL_DIR, compact=USE_COMPACT_MODELS)
 crop_scaler = joblib.load(os.path.join(MODEL_DIR, 'crop_recommendation_scaler.pkl'))
 crop_features = joblib.load(os.path.join(MODEL_DIR, 'crop_recommendation_features.pkl'))
-crop_labels = joblib.load(os.path.join(MODEL_DIR, 'crop_labels.pkl'))
+
+# Streaming input drift monitors, for models with a training reference
+drift_monitors = drift.load_monitors(MODEL_DIR, ['yield', 'crop'])
+
+# Interpretation rules, optionally overridden per crop/region
+RULE_SETS = rules.load_rules(os.getenv('ML_RULES_FILE'))
+
+# What-if sweep limits
+MAX_SWEEP_FEATURES = 2
+MAX_SWEEP_STEPS = 200
+
+# Features required by each bulk job type
+JOB_FEATURES = {
+    'predict-yield': yield_features,
+    'recommend-crop': crop_features
+}
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -41,6 +83,19 @@ def health_check():
         }
     })
 
+@app.route('/api/ml/models', methods=['GET'])
+def model_status():
+    """Registered and resident yield models"""
+    return jsonify(yield_registry.report())
+
+@app.route('/api/ml/drift', methods=['GET', 'DELETE'])
+def drift_status():
+    """Input drift scores against the training distributions; DELETE resets"""
+    if request.method == 'DELETE':
+        for monitor in drift_monitors.values():
+            monitor.reset()
+    return jsonify({name: monitor.report() for name, monitor in drift_monitors.items()})
+
 @app.route('/api/ml/predict-yield', methods=['POST'])
 def predict_yield():
     """
@@ -73,37 +128,36 @@ def predict_yield():
                 'error': f'Missing required features: {list(missing_features)}'
             }), 400
         
-        # Reorder columns to match training
-        input_df = input_df[yield_features]
-        
-        # Encode categorical variables
-        for column, encoder in yield_label_encoders.items():
-            if column in input_df.columns:
-                try:
-                    input_df[column] = encoder.transform(input_df[column])
-                except ValueError:
-                    # Handle unknown categories
-                    input_df[column] = 0
-        
-        # Scale features
-        input_scaled = yield_scaler.transform(input_df)
-        
-        # Make prediction
-        prediction = yield_model.predict(input_scaled)[0]
+        # Track input distribution for drift monitoring
+        record_inputs('yield', input_df)
         
-        # Get confidence interval (approximate)
-        confidence = 0.85  # Based on model R² score
+        # Make prediction with the most specific region/crop model; the
+        # interval comes from the spread of the forest's trees
+        stats, model_keys = predict_yields(input_df)
+        prediction = stats['yield'][0]
         
-        return jsonify({
+        response = {
             'success': True,
             'prediction': {
                 'yield': float(prediction),
                 'unit': 'hg/ha',
-                'confidence': confidence,
-                'interpretation': get_yield_interpretation(prediction)
-            },
-            'input': data
-        })
+                'confidence': float(stats['confidence'][0]),
+                'std': float(stats['std'][0]),
+                'interval': {
+                    'lower': float(stats['lower'][0]),
+                    'upper': float(stats['upper'][0]),
+                    'level': INTERVAL_LEVEL
+                },
+                'model': model_keys[0],
+                'interpretation': get_yield_interpretation(
+                    prediction, crop=data['Crop'], region=data['State Name']
+                )
+            }
+        }
+        if not is_compact(data):
+            response['input'] = data
+        
+        return json_response(response)
         
     except Exception as e:
         return jsonify({
@@ -144,6 +198,9 @@ def recommend_crop():
                 'error': f'Missing required features: {list(missing_features)}'
             }), 400
         
+        # Track input distribution for drift monitoring
+        record_inputs('crop', input_df)
+        
         # Reorder columns to match training
         input_df = input_df[crop_features]
         
@@ -159,13 +216,20 @@ def recommend_crop():
             
             # Get top 3 recommendations
             top_indices = np.argsort(probabilities)[-3:][::-1]
+            top_crops = crop_model.classes_[top_indices]
+            suitability = rules.expand(RULE_SETS, 'suitability', rules.classify(
+                RULE_SETS, 'suitability', probabilities[top_indices],
+                crops=top_crops, regions=[data.get('region')] * len(top_crops)
+            ))
             recommendations = [
                 {
-                    'crop': crop_labels[idx],
-                    'confidence': float(probabilities[idx]),
-                    'suitability': get_suitability_level(probabilities[idx])
+                    'crop': crop,
+                    'confidence': float(confidence),
+                    'suitability': level
                 }
-                for idx in top_indices
+                for crop, confidence, level in zip(
+                    top_crops, probabilities[top_indices], suitability
+                )
             ]
         else:
             recommendations = [{
@@ -174,13 +238,18 @@ def recommend_crop():
                 'suitability': 'High'
             }]
         
-        return jsonify({
+        response = {
             'success': True,
             'recommended_crop': prediction,
             'recommendations': recommendations,
-            'soil_analysis': analyze_soil_conditions(data),
-            'input': data
-        })
+            'soil_analysis': analyze_soil_conditions(
+                data, crop=prediction, region=data.get('region')
+            )
+        }
+        if not is_compact(data):
+            response['input'] = data
+        
+        return json_response(response)
         
     except Exception as e:
         return jsonify({
@@ -192,6 +261,11 @@ def recommend_crop():
 def batch_recommend():
     """
     Get crop recommendations for multiple soil samples
+
+    Samples may carry an optional "region" used to select interpretation rules.
+    With "format": "compact" (in the body or query string) inputs are not
+    echoed and results are returned as columns of category codes with a
+    legend of labels.
     """
     try:
         data = request.json
@@ -200,20 +274,155 @@ def batch_recommend():
         if not samples:
             return jsonify({'error': 'No samples provided'}), 400
         
-        results = []
-        for sample in samples:
-            input_df = pd.DataFrame([sample])[crop_features]
-            input_scaled = crop_scaler.transform(input_df)
-            prediction = crop_model.predict(input_scaled)[0]
-            
-            results.append({
-                'input': sample,
-                'recommended_crop': prediction
+        # Score all samples in one call
+        input_df = pd.DataFrame(samples)
+        missing_features = set(crop_features) - set(input_df.columns)
+        if missing_features:
+            return jsonify({
+                'error': f'Missing required features: {list(missing_features)}'
+            }), 400
+        
+        # Track input distribution for drift monitoring
+        record_inputs('crop', input_df)
+        
+        input_scaled = crop_scaler.transform(input_df[crop_features])
+        probabilities = crop_model.predict_proba(input_scaled)
+        best = probabilities.argmax(axis=1)
+        predictions = crop_model.classes_[best]
+        confidences = probabilities[np.arange(len(best)), best]
+        
+        # Evaluate interpretation rules over the whole batch
+        regions = input_df['region'] if 'region' in input_df else None
+        suitability = rules.classify(
+            RULE_SETS, 'suitability', confidences, crops=predictions, regions=regions
+        )
+        names, soil_codes, overall = rules.analyze_soil(
+            RULE_SETS, input_df, crops=predictions, regions=regions
+        )
+        
+        if is_compact(data):
+            return json_response({
+                'success': True,
+                'format': 'compact',
+                'results': {
+                    'recommended_crop': best,
+                    'confidence': confidences,
+                    'suitability': suitability,
+                    'soil_analysis': {
+                        **dict(zip(names, np.ascontiguousarray(soil_codes.T))),
+                        'overall': overall
+                    }
+                },
+                'legend': {
+                    'recommended_crop': crop_model.classes_,
+                    'suitability': RULE_SETS['default']['suitability']['labels'],
+                    'soil_analysis': RULE_SETS['default']['soil']['labels'],
+                    'overall': RULE_SETS['default']['soil_overall']['labels']
+                },
+                'total_samples': len(samples)
             })
         
+        # Codes are expanded to labels only for serialization
+        suitability = rules.expand(RULE_SETS, 'suitability', suitability)
+        soil_labels = rules.expand(RULE_SETS, 'soil', soil_codes)
+        overall = rules.expand(RULE_SETS, 'soil_overall', overall)
+        
+        results = [
+            {
+                'input': sample,
+                'recommended_crop': prediction,
+                'confidence': float(confidence),
+                'suitability': level,
+                'soil_analysis': {**dict(zip(names, soil_row)), 'overall': soil_overall}
+            }
+            for sample, prediction, confidence, level, soil_row, soil_overall in zip(
+                samples, predictions, confidences, suitability, soil_labels, overall
+            )
+        ]
+        
+        return json_response({
+            'success': True,
+            'results': results,
+            'total_samples': len(samples)
+        })
+        
+    except Exception as e:
         return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/ml/batch-predict-yield', methods=['POST'])
+def batch_predict_yield():
+    """
+    Predict yields with intervals for multiple inputs
+
+    With "format": "compact" (in the body or query string) inputs are not
+    echoed and results are returned as columns.
+    """
+    try:
+        data = request.json
+        samples = data.get('samples', [])
+        
+        if not samples:
+            return jsonify({'error': 'No samples provided'}), 400
+        
+        input_df = pd.DataFrame(samples)
+        missing_features = set(yield_features) - set(input_df.columns)
+        if missing_features:
+            return jsonify({
+                'error': f'Missing required features: {list(missing_features)}'
+            }), 400
+        
+        # Track input distribution for drift monitoring
+        record_inputs('yield', input_df)
+        
+        # Mean and interval come from one pass over all trees
+        stats, model_keys = predict_yields(input_df)
+        interpretation = rules.classify(
+            RULE_SETS, 'yield', stats['yield'],
+            crops=input_df['Crop'].to_numpy(), regions=input_df['State Name'].to_numpy()
+        )
+        
+        if is_compact(data):
+            return json_response({
+                'success': True,
+                'format': 'compact',
+                'results': {
+                    **stats,
+                    'model': model_keys,
+                    'interpretation': interpretation
+                },
+                'legend': {
+                    'interpretation': RULE_SETS['default']['yield']['labels']
+                },
+                'unit': 'hg/ha',
+                'interval_level': INTERVAL_LEVEL,
+                'total_samples': len(samples)
+            })
+        
+        interpretation = rules.expand(RULE_SETS, 'yield', interpretation)
+        results = [
+            {
+                'input': sample,
+                'yield': float(value),
+                'confidence': float(confidence),
+                'std': float(std),
+                'interval': {'lower': float(lower), 'upper': float(upper)},
+                'model': key,
+                'interpretation': label
+            }
+            for sample, value, confidence, std, lower, upper, key, label in zip(
+                samples, stats['yield'], stats['confidence'], stats['std'],
+                stats['lower'], stats['upper'], model_keys, interpretation
+            )
+        ]
+        
+        return json_response({
             'success': True,
             'results': results,
+            'unit': 'hg/ha',
+            'interval_level': INTERVAL_LEVEL,
             'total_samples': len(samples)
         })
         
@@ -223,47 +432,325 @@ def batch_recommend():
             'error': str(e)
         }), 500
 
-def get_yield_interpretation(yield_value):
-    """Interpret yield prediction"""
-    if yield_value > 50000:
-        return "Excellent yield expected"
-    elif yield_value > 30000:
-        return "Good yield expected"
-    elif yield_value > 15000:
-        return "Average yield expected"
-    else:
-        return "Below average yield expected"
-
-def get_suitability_level(confidence):
-    """Get suitability level based on confidence"""
-    if confidence > 0.8:
-        return "Highly Suitable"
-    elif confidence > 0.6:
-        return "Suitable"
-    elif confidence > 0.4:
-        return "Moderately Suitable"
+@app.route('/api/ml/jobs', methods=['GET', 'POST'])
+def bulk_jobs():
+    """
+    Submit a bulk scoring job, or report the job queue (GET)
+    
+    Expected input:
+    {
+        "type": "predict-yield" | "recommend-crop",
+        "samples": [...]
+    }
+    
+    Returns 202 with a job ID. Poll /api/ml/jobs/<job_id> for progress and
+    download /api/ml/jobs/<job_id>/results (JSON Lines, one row per sample)
+    once the job has succeeded.
+    """
+    if request.method == 'GET':
+        return jsonify(job_manager.report())
+    
+    try:
+        data = request.json
+        job_type = data.get('type')
+        samples = data.get('samples', [])
+        
+        if job_type not in JOB_FEATURES:
+            return jsonify({
+                'error': f'Job type must be one of {list(JOB_FEATURES)}'
+            }), 400
+        
+        if not samples:
+            return jsonify({'error': 'No samples provided'}), 400
+        
+        input_df = pd.DataFrame(samples)
+        missing_features = set(JOB_FEATURES[job_type]) - set(input_df.columns)
+        if missing_features:
+            return jsonify({
+                'error': f'Missing required features: {list(missing_features)}'
+            }), 400
+        
+        try:
+            status = job_manager.submit(job_type, input_df)
+        except jobs.QueueFull as e:
+            return jsonify({'success': False, 'error': str(e)}), 503, {'Retry-After': '30'}
+        
+        return jsonify({
+            'success': True,
+            'job_id': status['job_id'],
+            'status': status,
+            'status_url': f"/api/ml/jobs/{status['job_id']}",
+            'results_url': f"/api/ml/jobs/{status['job_id']}/results"
+        }), 202
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/ml/jobs/<job_id>', methods=['GET', 'DELETE'])
+def bulk_job_status(job_id):
+    """Status and progress of a bulk job; DELETE cancels it, or removes it once finished"""
+    if request.method == 'DELETE':
+        status = job_manager.status(job_id)
+        if status is not None and status['state'] in jobs.FINISHED:
+            status = job_manager.delete(job_id)
+        else:
+            status = job_manager.cancel(job_id)
     else:
-        return "Less Suitable"
+        status = job_manager.status(job_id)
+    
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(status)
 
-def analyze_soil_conditions(data):
-    """Analyze soil conditions and provide insights"""
-    analysis = {
-        'nitrogen': 'Optimal' if 20 <= data.get('N', 0) <= 100 else 'Needs adjustment',
-        'phosphorus': 'Optimal' if 10 <= data.get('P', 0) <= 80 else 'Needs adjustment',
-        'potassium': 'Optimal' if 10 <= data.get('K', 0) <= 60 else 'Needs adjustment',
-        'ph': 'Optimal' if 5.5 <= data.get('ph', 0) <= 7.5 else 'Needs adjustment',
-        'overall': 'Good'
+@app.route('/api/ml/jobs/<job_id>/results', methods=['GET'])
+def bulk_job_results(job_id):
+    """Spooled results of a succeeded bulk job as JSON Lines"""
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if status['state'] != jobs.SUCCEEDED:
+        return jsonify({
+            'error': f"Job is {status['state']}",
+            'status': status
+        }), 409
+    try:
+        return send_file(
+            os.path.abspath(job_manager.results_path(job_id)),
+            mimetype='application/x-ndjson',
+            as_attachment=True,
+            download_name=f'{job_id}.jsonl'
+        )
+    except FileNotFoundError:
+        # Deleted or pruned since its status was read
+        return jsonify({'error': 'Job not found'}), 404
+
+@app.route('/api/ml/sweep', methods=['POST'])
+def sweep():
+    """
+    What-if sensitivity sweep over one or two input features
+
+    Expected input:
+    {
+        "model": "yield" | "crop",
+        "base": { ...full input for the chosen model... },
+        "sweep": [
+            {"feature": "rainfall", "start": 50, "stop": 300, "steps": 100},
+            {"feature": "N", "values": [0, 20, 40, 60]}
+        ]
     }
+
+    The whole grid of variants is scored in one vectorized call. One swept
+    feature returns curves, two return heatmaps indexed [i][j] by the axis
+    values.
+    """
+    try:
+        data = request.json
+
+        # Validate input
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        model_name = data.get('model', 'crop')
+        if model_name not in ('yield', 'crop'):
+            return jsonify({'error': "model must be 'yield' or 'crop'"}), 400
+        features = yield_features if model_name == 'yield' else crop_features
+
+        base = data.get('base') or {}
+        if not isinstance(base, dict):
+            return jsonify({'error': 'base must be an object of feature values'}), 400
+        missing_features = set(features) - set(base)
+        if missing_features:
+            return jsonify({
+                'error': f'Missing required features: {list(missing_features)}'
+            }), 400
+
+        specs = data.get('sweep') or []
+        if not isinstance(specs, list) or not all(isinstance(spec, dict) for spec in specs):
+            return jsonify({'error': 'sweep must be a list of feature specs'}), 400
+        if not 1 <= len(specs) <= MAX_SWEEP_FEATURES:
+            return jsonify({
+                'error': f'sweep must list 1 to {MAX_SWEEP_FEATURES} features'
+            }), 400
+
+        axes = []
+        for spec in specs:
+            axis, error = build_sweep_axis(spec, features)
+            if error:
+                return jsonify({'error': error}), 400
+            axes.append(axis)
+
+        if len({axis['feature'] for axis in axes}) != len(axes):
+            return jsonify({'error': 'Swept features must be distinct'}), 400
+
+        # Build the full grid as one matrix of variants of the base input
+        grids = np.meshgrid(*[axis['values'] for axis in axes], indexing='ij')
+        shape = grids[0].shape
+        input_df = pd.DataFrame([base], columns=features)
+        input_df = input_df.iloc[np.zeros(grids[0].size, dtype=np.intp)]
+        input_df = input_df.reset_index(drop=True)
+        for axis, grid in zip(axes, grids):
+            input_df[axis['feature']] = grid.ravel()
+
+        response = {
+            'success': True,
+            'model': model_name,
+            'axes': [
+                {'feature': axis['feature'], 'values': axis['values']}
+                for axis in axes
+            ],
+            'grid_size': int(grids[0].size)
+        }
+
+        if model_name == 'yield':
+            stats, _ = predict_yields(input_df)
+            response['yield'] = stats['yield'].reshape(shape)
+            response['std'] = stats['std'].reshape(shape)
+            response['unit'] = 'hg/ha'
+        else:
+            input_scaled = crop_scaler.transform(input_df[crop_features])
+            probabilities = crop_model.predict_proba(input_scaled)
+            best = probabilities.argmax(axis=1)
+            # Crops are returned as indices into the 'crops' legend
+            response['crops'] = crop_model.classes_
+            response['recommended_crop'] = best.reshape(shape)
+            response['confidence'] = probabilities[np.arange(len(best)), best].reshape(shape)
+
+        return json_response(response)
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def build_sweep_axis(spec, features):
+    """Build the values of one sweep axis, returning (axis, error)"""
+    feature = spec.get('feature')
+    if feature not in features:
+        return None, f'Unknown sweep feature: {feature}'
+
+    # Sizes are checked before any array is built so a huge request is cheap to reject
+    size_error = f'Sweep of {feature} must have 1 to {MAX_SWEEP_STEPS} steps'
+    if 'values' in spec:
+        if not isinstance(spec['values'], list) or not 1 <= len(spec['values']) <= MAX_SWEEP_STEPS:
+            return None, size_error
+        values = np.asarray(spec['values'])
+        if values.ndim != 1:
+            return None, size_error
+    elif feature in yield_label_encoders:
+        return None, f'Categorical feature {feature} must be swept with values'
+    else:
+        try:
+            start, stop = float(spec['start']), float(spec['stop'])
+            steps = int(spec.get('steps', 50))
+        except (KeyError, TypeError, ValueError):
+            return None, f'Sweep of {feature} needs start, stop and steps'
+        if not 1 <= steps <= MAX_SWEEP_STEPS:
+            return None, size_error
+        values = np.linspace(start, stop, steps)
+
+    return {'feature': feature, 'values': values}, None
+
+def record_inputs(name, input_df):
+    """Add request inputs to a model's drift sketches"""
+    monitor = drift_monitors.get(name)
+    if monitor is not None:
+        monitor.update(input_df)
+
+def prepare_yield_features(input_df, bundle=None):
+    """Reorder, encode and scale yield features for a model bundle"""
+    bundle = bundle or yield_registry.global_bundle
+    input_df = input_df[bundle['features']].copy()
+
+    # Encode categorical variables, mapping unknown categories to 0
+    for column, encoder in bundle['label_encoders'].items():
+        if column in input_df.columns:
+            codes = {label: code for code, label in enumerate(encoder.classes_)}
+            input_df[column] = input_df[column].map(codes).fillna(0).astype(int)
+
+    return bundle['scaler'].transform(input_df)
+
+def predict_yields(input_df):
+    """
+    Predict yields, routing each row to its most specific region/crop model
+
+    Returns (stats, model keys): stats holds 'yield', 'std', 'lower', 'upper'
+    and 'confidence' arrays from the per-tree predictions, one entry per row.
+    """
+    keys = yield_registry.resolve_keys(input_df['State Name'], input_df['Crop'])
+    stats = {}
+    for key in np.unique(keys):
+        index = np.flatnonzero(keys == key)
+        bundle = yield_registry.get(key)
+        rows = input_df.iloc[index]
+        per_tree = tree_predictions(bundle['model'], prepare_yield_features(rows, bundle))
+        for name, values in summarize_trees(per_tree).items():
+            stats.setdefault(name, np.empty(len(input_df)))[index] = values
+    return stats, keys
+
+def score_yield_chunk(input_df):
+    """Yield predictions for one chunk of a bulk job"""
+    record_inputs('yield', input_df)
+    stats, model_keys = predict_yields(input_df)
+    interpretation = rules.classify(
+        RULE_SETS, 'yield', stats['yield'],
+        crops=input_df['Crop'].to_numpy(), regions=input_df['State Name'].to_numpy()
+    )
+    return pd.DataFrame({
+        **stats,
+        'model': model_keys,
+        'interpretation': rules.expand(RULE_SETS, 'yield', interpretation)
+    })
+
+def score_crop_chunk(input_df):
+    """Crop recommendations for one chunk of a bulk job"""
+    record_inputs('crop', input_df)
+    probabilities = crop_model.predict_proba(crop_scaler.transform(input_df[crop_features]))
+    best = probabilities.argmax(axis=1)
+    predictions = crop_model.classes_[best]
+    confidences = probabilities[np.arange(len(best)), best]
     
-    # Determine overall condition
-    adjustments_needed = sum(1 for v in analysis.values() if v == 'Needs adjustment')
-    if adjustments_needed >= 3:
-        analysis['overall'] = 'Poor - Multiple adjustments needed'
-    elif adjustments_needed >= 2:
-        analysis['overall'] = 'Fair - Some adjustments needed'
-    
+    regions = input_df['region'] if 'region' in input_df else None
+    suitability = rules.classify(
+        RULE_SETS, 'suitability', confidences, crops=predictions, regions=regions
+    )
+    names, soil_codes, overall = rules.analyze_soil(
+        RULE_SETS, input_df, crops=predictions, regions=regions
+    )
+    soil_labels = rules.expand(RULE_SETS, 'soil', soil_codes)
+    return pd.DataFrame({
+        'recommended_crop': predictions,
+        'confidence': confidences,
+        'suitability': rules.expand(RULE_SETS, 'suitability', suitability),
+        **{f'soil_{name}': soil_labels[:, i] for i, name in enumerate(names)},
+        'soil_overall': rules.expand(RULE_SETS, 'soil_overall', overall)
+    })
+
+def get_yield_interpretation(yield_value, crop=None, region=None):
+    """Interpret yield prediction"""
+    codes = rules.classify(
+        RULE_SETS, 'yield', [yield_value], crops=[crop], regions=[region]
+    )
+    return rules.expand(RULE_SETS, 'yield', codes)[0]
+
+def analyze_soil_conditions(data, crop=None, region=None):
+    """Analyze soil conditions and provide insights"""
+    names, codes, overall = rules.analyze_soil(
+        RULE_SETS, pd.DataFrame([data]), crops=[crop], regions=[region]
+    )
+    analysis = dict(zip(names, rules.expand(RULE_SETS, 'soil', codes[0])))
+    analysis['overall'] = rules.expand(RULE_SETS, 'soil_overall', overall)[0]
     return analysis
 
+# Bulk job queue and worker pool (see jobs.py)
+job_manager = jobs.init_jobs({
+    'predict-yield': score_yield_chunk,
+    'recommend-crop': score_crop_chunk
+})
+
 if __name__ == '__main__':
     port = int(os.getenv('ML_SERVICE_PORT', 5001))
     app.run(host='0.0.0.0', port=port, debug=True)
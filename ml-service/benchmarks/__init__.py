@@ -0,0 +1,3 @@
+"""
+Benchmarks for the FarmChain ML service
+"""
@@ -0,0 +1,275 @@
+"""
+Reproducible in-process inference benchmark for the ML service
+
+Measures per-stage and end-to-end latency percentiles and throughput of yield
+prediction, crop recommendation and batch recommendation at batch sizes from 1
+to 10k, plus service startup time and peak RSS. No network access is needed.
+Run from the ml-service directory:
+
+    python -m benchmarks.bench_inference --output results.json
+    python -m benchmarks.bench_inference --save-baseline
+    python -m benchmarks.bench_inference --check
+
+Baselines are machine-specific, so record one on the machine that runs the
+check. --check exits non-zero when a case regresses beyond the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import SyntheticInputs
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+BASELINE_PATH = os.path.join('benchmarks', 'baseline.json')
+# Relative slowdown of p50 latency (and growth of startup time/RSS) tolerated
+DEFAULT_THRESHOLD = 0.25
+# Target wall time per case; repeats are bounded by MIN_REPEAT and MAX_REPEAT
+TARGET_SECONDS = 2.0
+MIN_REPEAT = 5
+MAX_REPEAT = 200
+
+def measure_startup():
+    """Time to import the service and its RSS, in a fresh interpreter"""
+    code = (
+        'import json, resource, time\n'
+        'start = time.perf_counter()\n'
+        'import app\n'
+        'elapsed = time.perf_counter() - start\n'
+        'rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n'
+        'print(json.dumps({"seconds": elapsed, "rss_mb": rss / 1024}))\n'
+    )
+    output = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', code],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def summarize(name, batch_size, timings):
+    """Latency percentiles (ms) and throughput (rows/s) of one case"""
+    timings = np.asarray(timings)
+    p50 = float(np.percentile(timings, 50))
+    return {
+        'name': name,
+        'batch_size': batch_size,
+        'runs': len(timings),
+        'p50_ms': p50 * 1000,
+        'p95_ms': float(np.percentile(timings, 95)) * 1000,
+        'p99_ms': float(np.percentile(timings, 99)) * 1000,
+        'throughput_rps': batch_size / p50 if p50 > 0 else None
+    }
+
+def time_stages(stages, payload, repeat):
+    """Run a pipeline of (stage name, fn) repeatedly, timing each stage"""
+    timings = {name: [] for name, _ in stages}
+    timings['total'] = []
+    for _ in range(repeat):
+        value = payload
+        total = time.perf_counter()
+        for name, fn in stages:
+            start = time.perf_counter()
+            value = fn(value)
+            timings[name].append(time.perf_counter() - start)
+        timings['total'].append(time.perf_counter() - total)
+    return timings
+
+def repeats_for(seconds_per_run):
+    """Number of runs that fits the per-case time budget"""
+    if seconds_per_run <= 0:
+        return MAX_REPEAT
+    return int(np.clip(TARGET_SECONDS / seconds_per_run, MIN_REPEAT, MAX_REPEAT))
+
+def yield_stages(app, serialization, rules):
+    """Stages of yield prediction over a batch of request bodies"""
+    def interpret(predictions):
+        frame, (stats, model_keys) = predictions
+        codes = rules.classify(
+            app.RULE_SETS, 'yield', stats['yield'],
+            crops=frame['Crop'].to_numpy(), regions=frame['State Name'].to_numpy()
+        )
+        return {
+            **stats,
+            'model': model_keys,
+            'interpretation': rules.expand(app.RULE_SETS, 'yield', codes)
+        }
+
+    # predict_yields routes rows to registry models, encodes and scales them
+    # per model and computes per-tree intervals, as the service does
+    return [
+        ('frame', pd.DataFrame),
+        ('predict', lambda frame: (frame, app.predict_yields(frame))),
+        ('interpret', interpret),
+        ('serialize', serialization.dumps)
+    ]
+
+def recommend_stages(app, serialization, rules):
+    """Stages of crop recommendation over a batch of request bodies"""
+    def predict(prepared):
+        frame, scaled = prepared
+        return frame, app.crop_model.predict_proba(scaled)
+
+    def interpret(predicted):
+        frame, probabilities = predicted
+        best = probabilities.argmax(axis=1)
+        crops = app.crop_model.classes_[best]
+        confidences = probabilities[np.arange(len(best)), best]
+        suitability = rules.classify(app.RULE_SETS, 'suitability', confidences, crops=crops)
+        names, soil_codes, overall = rules.analyze_soil(app.RULE_SETS, frame, crops=crops)
+        return {
+            'recommended_crop': best,
+            'confidence': confidences,
+            'suitability': suitability,
+            'soil_analysis': dict(zip(names, np.ascontiguousarray(soil_codes.T))),
+            'overall': overall
+        }
+
+    return [
+        ('frame', pd.DataFrame),
+        ('preprocess', lambda frame: (frame, app.crop_scaler.transform(frame[app.crop_features]))),
+        ('predict', predict),
+        ('interpret', interpret),
+        ('serialize', serialization.dumps)
+    ]
+
+def run_pipeline(name, stages, samples, batch_sizes):
+    """Per-stage and total latency of a pipeline at each batch size"""
+    cases = []
+    for n in batch_sizes:
+        batch = samples[:n]
+        warmup = time_stages(stages, batch, 1)['total'][0]
+        timings = time_stages(stages, batch, repeats_for(warmup))
+        for stage, values in timings.items():
+            cases.append(summarize(f'{name}/{stage}', n, values))
+        print(f'  {name:<16} n={n:<6} p50 {cases[-1]["p50_ms"]:9.2f} ms')
+    return cases
+
+def run_request(client, name, url, make_body, batch_sizes):
+    """End-to-end latency of an HTTP endpoint through the Flask test client"""
+    cases = []
+    for n in batch_sizes:
+        body = make_body(n)
+
+        def call():
+            start = time.perf_counter()
+            response = client.post(url, json=body)
+            response.get_data()
+            assert response.status_code == 200, response.get_data(as_text=True)
+            return time.perf_counter() - start
+
+        timings = [call() for _ in range(repeats_for(call()))]
+        cases.append(summarize(f'{name}/request', n, timings))
+        print(f'  {name:<16} n={n:<6} p50 {cases[-1]["p50_ms"]:9.2f} ms')
+    return cases
+
+def run_benchmarks(batch_sizes, seed):
+    """Run every benchmark case and return the results document"""
+    startup = measure_startup()
+    print(f"Startup: {startup['seconds']:.2f}s, {startup['rss_mb']:.0f} MB RSS")
+
+    import app
+    import rules
+    import serialization
+
+    inputs = SyntheticInputs(seed=seed)
+    max_n = max(batch_sizes)
+    crop_samples = inputs.crop_samples(max_n)
+    yield_samples = inputs.yield_samples(
+        max_n,
+        app.yield_label_encoders['Crop'].classes_,
+        app.yield_label_encoders['State Name'].classes_
+    )
+    client = app.app.test_client()
+
+    cases = []
+    cases += run_pipeline('predict_yield', yield_stages(app, serialization, rules),
+                          yield_samples, batch_sizes)
+    cases += run_pipeline('recommend_crop', recommend_stages(app, serialization, rules),
+                          crop_samples, batch_sizes)
+    cases += run_request(client, 'predict_yield', '/api/ml/predict-yield',
+                         lambda n: yield_samples[0], [1])
+    cases += run_request(client, 'recommend_crop', '/api/ml/recommend-crop',
+                         lambda n: crop_samples[0], [1])
+    cases += run_request(client, 'batch_recommend', '/api/ml/batch-recommend',
+                         lambda n: {'samples': crop_samples[:n]}, batch_sizes)
+
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count()
+        },
+        'seed': seed,
+        'startup': startup,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'cases': cases
+    }
+
+def compare(results, baseline, threshold):
+    """List of regressions of results against a baseline"""
+    regressions = []
+    limit = 1 + threshold
+
+    for key, label in [('seconds', 'startup time'), ('rss_mb', 'startup RSS')]:
+        if results['startup'][key] > baseline['startup'][key] * limit:
+            regressions.append(
+                f"{label}: {results['startup'][key]:.2f} vs {baseline['startup'][key]:.2f}"
+            )
+    if results['peak_rss_mb'] > baseline['peak_rss_mb'] * limit:
+        regressions.append(
+            f"peak RSS: {results['peak_rss_mb']:.0f} MB vs {baseline['peak_rss_mb']:.0f} MB"
+        )
+
+    reference = {(c['name'], c['batch_size']): c for c in baseline['cases']}
+    for case in results['cases']:
+        base = reference.get((case['name'], case['batch_size']))
+        if base and case['p50_ms'] > base['p50_ms'] * limit:
+            regressions.append(
+                f"{case['name']} n={case['batch_size']}: "
+                f"p50 {case['p50_ms']:.2f} ms vs {base['p50_ms']:.2f} ms"
+            )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='In-process ML service inference benchmark')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results JSON to this path')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the baseline')
+    parser.add_argument('--check', action='store_true',
+                        help='fail if results regress against the baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.batch_sizes, args.seed)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Baseline saved to {args.baseline}')
+
+    if args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'\nRegressions beyond {args.threshold:.0%}:')
+            for regression in regressions:
+                print(f'  {regression}')
+            sys.exit(1)
+        print(f'\nNo regressions beyond {args.threshold:.0%}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark response size and time of batch-recommend response formats
+
+Runs in-process against the Flask app using the trained models. Run from the
+ml-service directory:
+
+    python -m benchmarks.bench_serialization
+"""
+import argparse
+import time
+
+import pandas as pd
+
+import app
+import serialization
+
+SIZES = [1000, 10000]
+ENCODINGS = ['identity', 'gzip', 'br']
+
+def make_samples(n, seed=42):
+    """Draw soil samples from the crop recommendation dataset"""
+    df = pd.read_csv('../Crop_recommendation.csv').drop(columns=['label'])
+    return df.sample(n, replace=True, random_state=seed).to_dict('records')
+
+def run_case(client, samples, fmt, encoding, repeat):
+    """Time one request variant, returning (best seconds, response bytes)"""
+    payload = {'samples': samples}
+    if fmt == 'compact':
+        payload['format'] = 'compact'
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.post(
+            '/api/ml/batch-recommend',
+            json=payload,
+            headers={'Accept-Encoding': encoding}
+        )
+        body = response.get_data()
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+
+    return min(timings), len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    encoders = ['orjson', 'json'] if serialization.orjson is not None else ['json']
+    encodings = [e for e in ENCODINGS if e != 'br' or serialization.brotli is not None]
+    client = app.app.test_client()
+
+    print(f"{'samples':>8} {'encoder':>7} {'format':>8} {'encoding':>9} {'ms':>9} {'bytes':>11}")
+    fast_json = serialization.orjson
+    for n in SIZES:
+        samples = make_samples(n)
+        for encoder in encoders:
+            serialization.orjson = fast_json if encoder == 'orjson' else None
+            for fmt in ['full', 'compact']:
+                for encoding in encodings:
+                    seconds, size = run_case(client, samples, fmt, encoding, args.repeat)
+                    print(f'{n:>8} {encoder:>7} {fmt:>8} {encoding:>9} '
+                          f'{seconds * 1000:>9.1f} {size:>11,}')
+    serialization.orjson = fast_json
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""
+HTTP load test replaying the Node backend's call pattern against the ML service
+
+backend/src/services/ml.service.js makes one HTTP call per farmer action with
+a 10 s axios timeout (30 s for batch recommendations of up to 50 samples) and
+checks /health with a 5 s timeout. This tool starts the service locally in
+each serving mode, replays that call mix as an open-loop Poisson arrival
+process at each target rate, and reports latency percentiles, error and
+timeout rates and achieved throughput. Everything runs on this machine.
+Run from the ml-service directory:
+
+    python -m benchmarks.loadtest --modes flask gunicorn-4 --rates 5 10 20 40
+    python -m benchmarks.loadtest --url http://localhost:5001 --rates 10
+
+Latency is measured from each request's scheduled send time, so queueing in
+the client under saturation is counted rather than hidden.
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import joblib
+import numpy as np
+
+from benchmarks.synthetic import SyntheticInputs
+
+# Calls made by ml.service.js: (name, method, path, timeout seconds)
+CALLS = {
+    'predict_yield': ('POST', '/api/ml/predict-yield', 10),
+    'recommend_crop': ('POST', '/api/ml/recommend-crop', 10),
+    'batch_recommend': ('POST', '/api/ml/batch-recommend', 30),
+    'health': ('GET', '/health', 5)
+}
+DEFAULT_MIX = {
+    'recommend_crop': 0.45,
+    'predict_yield': 0.35,
+    'batch_recommend': 0.15,
+    'health': 0.05
+}
+MAX_BATCH = 50
+STARTUP_TIMEOUT = 120
+
+def free_port():
+    """An unused local TCP port"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def server_command(mode, port):
+    """Command line that serves the app in a given mode"""
+    if mode == 'flask':
+        code = f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"
+        return [sys.executable, '-W', 'ignore', '-c', code]
+    if mode == 'flask-single':
+        code = f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=False)"
+        return [sys.executable, '-W', 'ignore', '-c', code]
+    if mode.startswith('gunicorn-'):
+        if importlib.util.find_spec('gunicorn') is None:
+            raise RuntimeError(f'Mode {mode} needs gunicorn: pip install gunicorn')
+        workers = int(mode.split('-', 1)[1])
+        return [sys.executable, '-m', 'gunicorn', '-w', str(workers),
+                '-b', f'127.0.0.1:{port}', '--timeout', '60', 'app:app']
+    raise ValueError(f'Unknown serving mode: {mode}')
+
+def log_tail(log, size=2000):
+    """Last bytes of a server's captured stderr"""
+    log.seek(0, os.SEEK_END)
+    log.seek(max(log.tell() - size, 0))
+    return log.read().decode(errors='replace').strip()
+
+def wait_healthy(host, port, process, log=None):
+    """Block until the service answers /health"""
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            message = f'Service exited with code {process.returncode}'
+            if log is not None:
+                message += f'; stderr:\n{log_tail(log)}'
+            raise RuntimeError(message)
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError('Service did not become healthy in time')
+
+def make_bodies(inputs, n):
+    """Pre-generated request bodies for each call type"""
+    encoders = joblib.load(os.path.join('models', 'yield_label_encoders.pkl'))
+    crop_samples = inputs.crop_samples(n)
+    rng = inputs.rng
+    return {
+        'predict_yield': [
+            json.dumps(s).encode() for s in inputs.yield_samples(
+                n, encoders['Crop'].classes_, encoders['State Name'].classes_
+            )
+        ],
+        'recommend_crop': [json.dumps(s).encode() for s in crop_samples],
+        'batch_recommend': [
+            json.dumps({'samples': crop_samples[i:i + rng.integers(1, MAX_BATCH + 1)]}).encode()
+            for i in range(n)
+        ],
+        'health': [None]
+    }
+
+def send(host, port, call, body):
+    """Send one request on a fresh connection, as axios does by default"""
+    method, path, timeout = CALLS[call]
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return 'ok' if response.status < 400 else 'error'
+    except socket.timeout:
+        return 'timeout'
+    except OSError:
+        return 'error'
+    finally:
+        conn.close()
+
+def run_rate(host, port, bodies, mix, rate, duration, concurrency, rng):
+    """Open-loop run at a target request rate; returns per-request records"""
+    calls = list(mix)
+    weights = np.array([mix[c] for c in calls], dtype=float)
+    n = max(1, int(rate * duration))
+    offsets = np.cumsum(rng.exponential(1 / rate, size=n))
+    chosen = rng.choice(len(calls), size=n, p=weights / weights.sum())
+
+    records = []
+    lock = threading.Lock()
+
+    def task(scheduled, call, body):
+        outcome = send(host, port, call, body)
+        with lock:
+            records.append((call, outcome, time.perf_counter() - scheduled))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, (offset, index) in enumerate(zip(offsets, chosen)):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            call = calls[index]
+            pool.submit(task, start + offset, call, bodies[call][i % len(bodies[call])])
+    elapsed = time.perf_counter() - start
+    return records, elapsed
+
+def summarize(records, elapsed, rate):
+    """Latency percentiles, error/timeout rates and throughput of a run"""
+    def stats(rows):
+        latencies = np.array([r[2] for r in rows if r[1] == 'ok']) * 1000
+        total = len(rows)
+        return {
+            'requests': total,
+            'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else None,
+            'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'error_rate': sum(r[1] == 'error' for r in rows) / total if total else 0.0,
+            'timeout_rate': sum(r[1] == 'timeout' for r in rows) / total if total else 0.0
+        }
+
+    summary = stats(records)
+    summary['target_rps'] = rate
+    summary['achieved_rps'] = sum(r[1] == 'ok' for r in records) / elapsed
+    summary['calls'] = {
+        call: stats([r for r in records if r[0] == call])
+        for call in sorted({r[0] for r in records})
+    }
+    return summary
+
+def parse_mix(text):
+    """Parse a call mix such as 'recommend_crop=0.5,predict_yield=0.5'"""
+    mix = {}
+    for part in text.split(','):
+        call, _, weight = part.partition('=')
+        if call not in CALLS:
+            raise argparse.ArgumentTypeError(f'Unknown call in mix: {call}')
+        mix[call] = float(weight)
+    return mix
+
+def run_mode(mode, args, bodies):
+    """Start the service in a serving mode and sweep the target rates"""
+    process = None
+    log = None
+    if args.url:
+        parsed = urlparse(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        host, port = '127.0.0.1', free_port()
+        # stderr goes to a file rather than a pipe, which request logs could fill
+        log = tempfile.TemporaryFile()
+        process = subprocess.Popen(
+            server_command(mode, port),
+            stdout=subprocess.DEVNULL, stderr=log
+        )
+
+    try:
+        wait_healthy(host, port, process, log)
+        rng = np.random.default_rng(args.seed)
+        curve = []
+        for rate in args.rates:
+            records, elapsed = run_rate(
+                host, port, bodies, args.mix, rate, args.duration, args.concurrency, rng
+            )
+            summary = summarize(records, elapsed, rate)
+            curve.append(summary)
+            p50 = summary['p50_ms'] or float('nan')
+            p99 = summary['p99_ms'] or float('nan')
+            print(f"{mode:<14} {rate:>7.1f} {summary['achieved_rps']:>9.1f} "
+                  f"{p50:>9.1f} {p99:>9.1f} {summary['error_rate']:>7.1%} "
+                  f"{summary['timeout_rate']:>8.1%}")
+        return curve
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+            log.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the ML service with the backend call mix')
+    parser.add_argument('--modes', nargs='+', default=['flask'],
+                        help='serving modes: flask, flask-single, gunicorn-<workers>')
+    parser.add_argument('--url', help='target an already running service instead')
+    parser.add_argument('--rates', type=float, nargs='+', default=[5, 10, 20, 40],
+                        help='target request rates (requests/second)')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per rate')
+    parser.add_argument('--concurrency', type=int, default=64,
+                        help='maximum in-flight requests')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='call weights, e.g. recommend_crop=0.5,batch_recommend=0.5')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results JSON to this path')
+    args = parser.parse_args()
+
+    inputs = SyntheticInputs(seed=args.seed)
+    bodies = make_bodies(inputs, 2000)
+    modes = ['external'] if args.url else args.modes
+
+    print(f"{'mode':<14} {'target':>7} {'achieved':>9} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'errors':>7} {'timeouts':>8}")
+    results = {mode: run_mode(mode, args, bodies) for mode in modes}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'mix': args.mix,
+                'duration': args.duration,
+                'concurrency': args.concurrency,
+                'modes': results
+            }, f, indent=2)
+
+if __name__ == '__main__':
+    main()
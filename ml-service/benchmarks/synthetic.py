@@ -0,0 +1,56 @@
+"""
+Synthetic, reproducible inputs for benchmarks and load tests
+
+Soil and climate readings are drawn per crop from the mean and standard
+deviation of Crop_recommendation.csv and clipped to the observed range.
+"""
+import numpy as np
+import pandas as pd
+
+CROP_DATASET = '../Crop_recommendation.csv'
+
+# Yield model inputs that correspond to crop recommendation features
+YIELD_FEATURE_MAP = {
+    'N_req_kg_per_ha': 'N',
+    'P_req_kg_per_ha': 'P',
+    'K_req_kg_per_ha': 'K',
+    'Temperature_C': 'temperature',
+    'Humidity_%': 'humidity',
+    'pH': 'ph',
+    'Rainfall_mm': 'rainfall'
+}
+
+class SyntheticInputs:
+    """Generator of crop recommendation and yield prediction inputs"""
+
+    def __init__(self, path=CROP_DATASET, seed=42):
+        df = pd.read_csv(path)
+        self.features = [c for c in df.columns if c != 'label']
+        stats = df.groupby('label')[self.features]
+        self.mean = stats.mean().to_numpy()
+        self.std = stats.std().fillna(0).to_numpy()
+        self.low = df[self.features].min().to_numpy()
+        self.high = df[self.features].max().to_numpy()
+        self.rng = np.random.default_rng(seed)
+
+    def soil_matrix(self, n):
+        """(n, features) matrix of soil and climate readings"""
+        crops = self.rng.integers(len(self.mean), size=n)
+        values = self.rng.normal(self.mean[crops], self.std[crops])
+        return np.clip(values, self.low, self.high)
+
+    def crop_samples(self, n):
+        """Crop recommendation request bodies"""
+        return pd.DataFrame(self.soil_matrix(n), columns=self.features).to_dict('records')
+
+    def yield_samples(self, n, crops, states):
+        """Yield prediction request bodies using known crop and state names"""
+        soil = pd.DataFrame(self.soil_matrix(n), columns=self.features)
+        frame = pd.DataFrame({
+            name: soil[source] for name, source in YIELD_FEATURE_MAP.items()
+        })
+        frame['Year'] = self.rng.integers(1997, 2021, size=n)
+        frame['Area_ha'] = np.round(self.rng.lognormal(6, 1.2, size=n), 1)
+        frame['Crop'] = self.rng.choice(np.asarray(crops, dtype=object), size=n)
+        frame['State Name'] = self.rng.choice(np.asarray(states, dtype=object), size=n)
+        return frame.to_dict('records')
@@ -0,0 +1,257 @@
+"""
+Compact representation of the random forest models
+
+All trees of a forest are flattened into shared node arrays with float32
+thresholds (rounded down, so splits of float32 inputs are unchanged), the
+smallest integer types for feature and child indices, and leaf values stored
+only for leaves: float32 for regressors and quantized uint8 (or float16)
+class probabilities for classifiers. CompactForest
+evaluates every tree for a whole batch at once with NumPy and exposes the
+predict/predict_proba/classes_ interface the service uses.
+
+Export the trained models and report memory savings and accuracy drift:
+
+    python compact_forest.py
+"""
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+
+MODEL_DIR = 'models'
+COMPACT_SUFFIX = '.compact.npz'
+# Rows traversed together; bounds the (rows, trees) working arrays
+CHUNK_ROWS = 4096
+UINT8_SCALE = 255
+
+def _index_dtype(n):
+    """Smallest unsigned integer type indexing n items"""
+    return np.min_scalar_type(max(n - 1, 0))
+
+def sklearn_tree_bytes(model):
+    """Bytes held by the node and value arrays of a fitted sklearn forest"""
+    total = 0
+    for estimator in model.estimators_:
+        state = estimator.tree_.__getstate__()
+        total += state['nodes'].nbytes + state['values'].nbytes
+    return total
+
+class CompactForest:
+    """Flattened, quantized random forest evaluated with NumPy"""
+
+    def __init__(self, arrays):
+        self.kind = str(arrays['kind'])
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.leaf_values = arrays['leaf_values']
+        self.max_depth = int(arrays['max_depth'])
+        self.n_features_in_ = int(arrays['n_features'])
+        if self.kind == 'classifier':
+            self.classes_ = np.asarray(arrays['classes'], dtype=object)
+
+    @classmethod
+    def from_sklearn(cls, model, proba_dtype='uint8'):
+        """Export a fitted RandomForestRegressor or RandomForestClassifier"""
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        counts = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        n_nodes = int(counts.sum())
+
+        feature = np.concatenate([tree.feature for tree in trees])
+        is_leaf = feature < 0
+        leaf_ids = np.cumsum(is_leaf) - 1
+        left = np.concatenate([tree.children_left + off for tree, off in zip(trees, offsets)])
+        right = np.concatenate([tree.children_right + off for tree, off in zip(trees, offsets)])
+        # Leaves store their row in leaf_values in place of a child index
+        left = np.where(is_leaf, leaf_ids, left)
+        right = np.where(is_leaf, leaf_ids, right)
+
+        values = np.concatenate([tree.value[:, 0, :] for tree in trees])[is_leaf]
+        is_classifier = hasattr(model, 'classes_')
+        if is_classifier:
+            values = values / values.sum(axis=1, keepdims=True)
+            if proba_dtype == 'uint8':
+                values = np.rint(values * UINT8_SCALE).astype(np.uint8)
+            else:
+                values = values.astype(np.float16)
+        else:
+            values = values[:, 0].astype(np.float32)
+
+        # Round thresholds toward -inf so x <= threshold matches sklearn exactly
+        # for float32 inputs, which sklearn compares against float64 thresholds
+        threshold = np.concatenate([tree.threshold for tree in trees])
+        threshold32 = threshold.astype(np.float32)
+        threshold32 = np.where(
+            threshold32 > threshold, np.nextafter(threshold32, np.float32(-np.inf)), threshold32
+        )
+
+        n_features = model.n_features_in_
+        arrays = {
+            'kind': np.array('classifier' if is_classifier else 'regressor'),
+            'roots': offsets.astype(_index_dtype(n_nodes)),
+            'feature': np.where(is_leaf, -1, feature).astype(
+                np.int8 if n_features < np.iinfo(np.int8).max else np.int16
+            ),
+            'threshold': threshold32,
+            'left': left.astype(_index_dtype(n_nodes)),
+            'right': right.astype(_index_dtype(n_nodes)),
+            'leaf_values': values,
+            'max_depth': np.array(max(tree.max_depth for tree in trees)),
+            'n_features': np.array(n_features)
+        }
+        if is_classifier:
+            arrays['classes'] = np.asarray(model.classes_).astype(str)
+        return cls(arrays)
+
+    def arrays(self):
+        """Arrays making up the compact model"""
+        arrays = {
+            'kind': np.array(self.kind),
+            'roots': self.roots,
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'leaf_values': self.leaf_values,
+            'max_depth': np.array(self.max_depth),
+            'n_features': np.array(self.n_features_in_)
+        }
+        if self.kind == 'classifier':
+            arrays['classes'] = np.asarray(self.classes_).astype(str)
+        return arrays
+
+    @property
+    def nbytes(self):
+        """Bytes held by the model arrays"""
+        return sum(array.nbytes for array in self.arrays().values())
+
+    def save(self, path):
+        """Save the compact model as an uncompressed .npz file"""
+        np.savez(path, **self.arrays())
+
+    @classmethod
+    def load(cls, path):
+        """Load a compact model saved with save()"""
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def apply(self, X):
+        """(n_samples, n_trees) leaf_values rows reached by each sample"""
+        X = np.asarray(X, dtype=np.float32)
+        n_trees = len(self.roots)
+        leaves = np.empty((len(X), n_trees), dtype=self.left.dtype)
+
+        for start in range(0, len(X), CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            rows = np.arange(len(chunk))[:, None]
+            node = np.broadcast_to(self.roots.astype(np.intp), (len(chunk), n_trees))
+            for _ in range(self.max_depth):
+                feature = self.feature[node]
+                split = feature >= 0
+                if not split.any():
+                    break
+                go_left = chunk[rows, np.maximum(feature, 0)] <= self.threshold[node]
+                child = np.where(go_left, self.left[node], self.right[node])
+                node = np.where(split, child, node)
+            leaves[start:start + len(chunk)] = self.left[node]
+        return leaves
+
+    def predict_trees(self, X):
+        """(n_samples, n_trees) per-tree predictions of a regressor"""
+        return self.leaf_values[self.apply(X)]
+
+    def predict_proba(self, X):
+        """Class probabilities averaged over all trees"""
+        leaves = self.apply(X)
+        proba = np.zeros((len(leaves), self.leaf_values.shape[1]))
+        for t in range(leaves.shape[1]):
+            proba += self.leaf_values[leaves[:, t]]
+        if self.leaf_values.dtype == np.uint8:
+            proba /= UINT8_SCALE
+        proba /= leaves.shape[1]
+        return proba
+
+    def predict(self, X):
+        """Mean prediction of a regressor, or most likely class of a classifier"""
+        if self.kind == 'classifier':
+            return self.classes_[self.predict_proba(X).argmax(axis=1)]
+        return self.predict_trees(X).mean(axis=1, dtype=np.float64)
+
+def compact_path(name, model_dir=MODEL_DIR):
+    """Path of the compact export of a model"""
+    return os.path.join(model_dir, name + COMPACT_SUFFIX)
+
+def load_model(name, model_dir=MODEL_DIR, compact=False):
+    """Load a model, preferring its compact export when compact is set"""
+    path = compact_path(name, model_dir)
+    if compact and os.path.exists(path):
+        return CompactForest.load(path)
+    return joblib.load(os.path.join(model_dir, name + '.pkl'))
+
+def report_memory(name, model, compact):
+    """Print memory of the sklearn and compact representations"""
+    before = sklearn_tree_bytes(model)
+    after = compact.nbytes
+    print(f"{name}: {before / 2 ** 20:.1f} MB -> {after / 2 ** 20:.1f} MB "
+          f"({1 - after / before:.0%} smaller)")
+
+def export_crop_model(proba_dtype='uint8'):
+    """Export the crop model and measure drift on Crop_recommendation.csv"""
+    name = 'crop_recommendation_model'
+    model = joblib.load(os.path.join(MODEL_DIR, name + '.pkl'))
+    compact = CompactForest.from_sklearn(model, proba_dtype=proba_dtype)
+    compact.save(compact_path(name))
+    report_memory(name, model, compact)
+
+    df = pd.read_csv('../Crop_recommendation.csv')
+    scaler = joblib.load(os.path.join(MODEL_DIR, 'crop_recommendation_scaler.pkl'))
+    features = joblib.load(os.path.join(MODEL_DIR, 'crop_recommendation_features.pkl'))
+    X = scaler.transform(df[features])
+    reference = model.predict_proba(X)
+    proba = compact.predict_proba(X)
+    labels = df['label'].to_numpy()
+
+    print(f"  accuracy: {np.mean(model.classes_[reference.argmax(axis=1)] == labels):.4f} "
+          f"-> {np.mean(compact.classes_[proba.argmax(axis=1)] == labels):.4f}")
+    print(f"  agreement: {np.mean(reference.argmax(axis=1) == proba.argmax(axis=1)):.4f}, "
+          f"max probability error: {np.abs(reference - proba).max():.4f}")
+
+def export_yield_model():
+    """Export the yield model and measure drift on the yield dataset"""
+    name = 'yield_prediction_model'
+    model = joblib.load(os.path.join(MODEL_DIR, name + '.pkl'))
+    compact = CompactForest.from_sklearn(model)
+    compact.save(compact_path(name))
+    report_memory(name, model, compact)
+
+    import dataset
+    if not os.path.exists(dataset.YIELD_DATASET):
+        print(f'  drift not measured: {dataset.YIELD_DATASET} not found')
+        return
+
+    data = dataset.load_dataset(dataset.YIELD_DATASET, dataset.YIELD_SCHEMA)
+    features = joblib.load(os.path.join(MODEL_DIR, 'yield_feature_names.pkl'))
+    scaler = joblib.load(os.path.join(MODEL_DIR, 'yield_scaler.pkl'))
+    X = scaler.transform(dataset.to_frame(data, features, codes=True))
+    y = data['columns']['Yield_kg_per_ha']
+    reference = model.predict(X)
+    predicted = compact.predict(X)
+
+    def r2(pred):
+        return 1 - np.sum((y - pred) ** 2) / np.sum((y - y.mean()) ** 2)
+
+    print(f"  R²: {r2(reference):.4f} -> {r2(predicted):.4f}")
+    print(f"  max abs error vs sklearn: {np.abs(reference - predicted).max():.4f}, "
+          f"mean relative error: {np.mean(np.abs(reference - predicted) / np.abs(reference)):.2e}")
+
+if __name__ == '__main__':
+    proba_dtype = sys.argv[1] if len(sys.argv) > 1 else 'uint8'
+    if proba_dtype not in ('uint8', 'float16'):
+        sys.exit('usage: python compact_forest.py [uint8|float16]')
+    export_crop_model(proba_dtype)
+    export_yield_model()
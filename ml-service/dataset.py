@@ -0,0 +1,213 @@
+"""
+Dataset preparation for model training and evaluation
+
+CSV sources are read in chunks with explicit compact dtypes and written once
+to a columnar snapshot of .npy files keyed by the source file hash. Later runs
+load the snapshot as memory-mapped arrays instead of re-parsing the CSV.
+Categorical columns are stored as integer codes into sorted categories, which
+match the codes a fitted LabelEncoder would assign.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+CACHE_DIR = 'data_cache'
+CHUNK_SIZE = 500_000
+
+CROP_DATASET = '../Crop_recommendation.csv'
+YIELD_DATASET = '../Custom_Crops_yield_Historical_Dataset.csv'
+
+# Column dtypes; 'category' columns are stored as integer codes
+CROP_SCHEMA = {
+    'N': 'float32',
+    'P': 'float32',
+    'K': 'float32',
+    'temperature': 'float32',
+    'humidity': 'float32',
+    'ph': 'float32',
+    'rainfall': 'float32',
+    'label': 'category'
+}
+
+YIELD_SCHEMA = {
+    'Year': 'int16',
+    'Area_ha': 'float32',
+    'N_req_kg_per_ha': 'float32',
+    'P_req_kg_per_ha': 'float32',
+    'K_req_kg_per_ha': 'float32',
+    'Temperature_C': 'float32',
+    'Humidity_%': 'float32',
+    'pH': 'float32',
+    'Rainfall_mm': 'float32',
+    'Crop': 'category',
+    'State Name': 'category',
+    'Yield_kg_per_ha': 'float32'
+}
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def snapshot_dir(path, schema, cache_dir=CACHE_DIR):
+    """Snapshot directory for a source file and schema"""
+    digest = hashlib.sha256(file_hash(path).encode())
+    digest.update(json.dumps(schema, sort_keys=True).encode())
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f'{name}-{digest.hexdigest()[:16]}')
+
+def _code_dtype(n_categories):
+    """Smallest integer dtype holding category codes"""
+    return np.int16 if n_categories <= np.iinfo(np.int16).max else np.int32
+
+def build_snapshot(path, schema, out_dir, chunksize=CHUNK_SIZE):
+    """
+    Read a CSV in chunks and write its columns as .npy files
+
+    Each parsed chunk is spooled to temporary files, then copied into column
+    files preallocated to the final row count, so memory use is bounded by the
+    chunk size rather than the dataset size.
+    """
+    categorical = [c for c, dtype in schema.items() if dtype == 'category']
+    read_dtypes = {c: (str if dtype == 'category' else 'float32') for c, dtype in schema.items()}
+
+    tmp_dir = tempfile.mkdtemp(prefix='.snapshot-', dir=os.path.dirname(out_dir))
+
+    def part_path(column, index):
+        return os.path.join(tmp_dir, f'.part-{index}-{column}.npy')
+
+    # Codes are assigned in first-seen order, then remapped to sorted order
+    seen = {column: {} for column in categorical}
+    chunk_rows = []
+
+    for index, chunk in enumerate(
+        pd.read_csv(path, usecols=list(schema), dtype=read_dtypes, chunksize=chunksize)
+    ):
+        chunk = chunk.dropna()
+        chunk_rows.append(len(chunk))
+        for column, dtype in schema.items():
+            if dtype == 'category':
+                codes = seen[column]
+                values, inverse = np.unique(chunk[column].to_numpy(), return_inverse=True)
+                lookup = np.array([codes.setdefault(v, len(codes)) for v in values], dtype=np.int32)
+                values = lookup[inverse]
+            else:
+                values = chunk[column].to_numpy().astype(dtype)
+            np.save(part_path(column, index), values)
+
+    n_rows = sum(chunk_rows)
+    categories = {}
+    for column, dtype in schema.items():
+        if dtype == 'category':
+            labels = sorted(seen[column])
+            order = np.empty(len(labels), dtype=np.int32)
+            order[[seen[column][label] for label in labels]] = np.arange(len(labels))
+            dtype = _code_dtype(len(labels))
+            categories[column] = labels
+
+        column_path = os.path.join(tmp_dir, f'{column}.npy')
+        if not n_rows:
+            np.save(column_path, np.empty(0, dtype=dtype))
+        else:
+            values = np.lib.format.open_memmap(column_path, mode='w+', dtype=dtype, shape=(n_rows,))
+            offset = 0
+            for index, rows in enumerate(chunk_rows):
+                part = np.load(part_path(column, index))
+                values[offset:offset + rows] = order[part] if column in categories else part
+                offset += rows
+            values.flush()
+            del values
+        for index in range(len(chunk_rows)):
+            os.remove(part_path(column, index))
+
+    meta = {
+        'source': os.path.abspath(path),
+        'rows': n_rows,
+        'schema': schema,
+        'categories': categories
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    # Publish atomically so concurrent runs never see a partial snapshot
+    try:
+        os.rename(tmp_dir, out_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.isdir(out_dir):
+            raise
+
+def load_dataset(path, schema, cache_dir=CACHE_DIR, mmap=True):
+    """
+    Load a dataset snapshot, building it from the CSV if needed
+
+    Returns a dict with 'columns' (name -> array, memory-mapped read-only when
+    mmap is True), 'categories' (name -> sorted labels), 'rows' and 'path'.
+    """
+    out_dir = snapshot_dir(path, schema, cache_dir)
+    if not os.path.isdir(out_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        build_snapshot(path, schema, out_dir)
+    return open_snapshot(out_dir, mmap)
+
+def open_snapshot(out_dir, mmap=True):
+    """Load an existing snapshot directory, as returned by load_dataset"""
+    with open(os.path.join(out_dir, 'meta.json')) as f:
+        meta = json.load(f)
+
+    columns = {
+        column: np.load(os.path.join(out_dir, f'{column}.npy'), mmap_mode='r' if mmap else None)
+        for column in meta['schema']
+    }
+    return {
+        'columns': columns,
+        'categories': meta['categories'],
+        'rows': meta['rows'],
+        'path': out_dir
+    }
+
+def to_frame(data, columns, codes=False):
+    """
+    DataFrame of selected columns
+
+    Categorical columns are returned as pandas Categoricals, or as their
+    integer codes when codes is True.
+    """
+    frame = {}
+    for column in columns:
+        values = data['columns'][column]
+        if column in data['categories'] and not codes:
+            values = pd.Categorical.from_codes(values, categories=data['categories'][column])
+        frame[column] = values
+    return pd.DataFrame(frame, copy=False)
+
+def label_encoders(data, columns):
+    """LabelEncoders equivalent to the snapshot's category codes"""
+    encoders = {}
+    for column in columns:
+        encoder = LabelEncoder()
+        encoder.classes_ = np.array(data['categories'][column], dtype=object)
+        encoders[column] = encoder
+    return encoders
+
+if __name__ == '__main__':
+    for source, schema in [(CROP_DATASET, CROP_SCHEMA), (YIELD_DATASET, YIELD_SCHEMA)]:
+        if not os.path.exists(source):
+            print(f'Skipping {source}: not found', file=sys.stderr)
+            continue
+        start = time.perf_counter()
+        data = load_dataset(source, schema)
+        size = sum(values.nbytes for values in data['columns'].values())
+        print(f"{source}: {data['rows']} rows, {size / 1e6:.1f} MB "
+              f"in {data['path']} ({time.perf_counter() - start:.2f}s)")
@@ -0,0 +1,215 @@
+"""
+Input drift monitoring with constant-memory streaming sketches
+
+train_models.py saves a reference snapshot per model: histogram bin edges and
+proportions for each numeric feature (quantile bins of the training data) and
+category frequencies for each categorical feature. The service keeps a
+fixed-size histogram per numeric feature and capped category counts per
+categorical feature, updated with O(1) work per value, and scores drift as
+the population stability index (PSI) against the reference.
+
+PSI below 0.1 is usually read as stable, 0.1-0.25 as a moderate shift and
+above 0.25 as significant drift. With few rows per bin PSI is dominated by
+sampling noise, so a feature is only scored once it has MIN_ROWS_PER_BIN
+observed values per bin (or category).
+"""
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_BINS = 20
+# Distinct unseen categories tracked per feature; the rest are only counted
+MAX_UNSEEN = 50
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+# Observed values per histogram bin or category before PSI is reported
+MIN_ROWS_PER_BIN = 10
+INSUFFICIENT_DATA = 'insufficient_data'
+EPSILON = 1e-4
+
+def reference_path(model_dir, name):
+    """Path of a model's drift reference snapshot"""
+    return os.path.join(model_dir, f'{name}_drift_reference.json')
+
+def _bin_counts(values, edges):
+    """Counts of values in (-inf, e0], (e0, e1], ..., (e_last, inf)"""
+    index = np.searchsorted(edges, values, side='left')
+    return np.bincount(index, minlength=len(edges) + 1)
+
+def build_reference(frame, numeric, categorical, bins=DEFAULT_BINS):
+    """Reference histograms and category frequencies of training data"""
+    reference = {'rows': len(frame), 'numeric': {}, 'categorical': {}}
+    for feature in numeric:
+        values = frame[feature].to_numpy(dtype=float)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = _bin_counts(values, edges)
+        reference['numeric'][feature] = {
+            'edges': edges.tolist(),
+            'proportions': (counts / counts.sum()).tolist(),
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'mean': float(values.mean())
+        }
+    for feature in categorical:
+        frequencies = frame[feature].astype(str).value_counts(normalize=True)
+        reference['categorical'][feature] = {
+            'frequencies': {str(k): float(v) for k, v in frequencies.items()}
+        }
+    return reference
+
+def save_reference(reference, model_dir, name):
+    """Write a model's drift reference snapshot"""
+    with open(reference_path(model_dir, name), 'w') as f:
+        json.dump(reference, f, indent=2)
+
+def psi(observed, expected):
+    """Population stability index between two proportion vectors"""
+    observed = np.clip(observed, EPSILON, None)
+    expected = np.clip(np.asarray(expected, dtype=float), EPSILON, None)
+    return float(np.sum((observed - expected) * np.log(observed / expected)))
+
+def _status(score):
+    if score is None:
+        return INSUFFICIENT_DATA
+    if score >= PSI_ALERT:
+        return 'alert'
+    if score >= PSI_WARN:
+        return 'warn'
+    return 'ok'
+
+class DriftMonitor:
+    """Streaming sketches of one model's inputs against its reference"""
+
+    def __init__(self, reference):
+        self.reference = reference
+        self._edges = {
+            feature: np.asarray(ref['edges']) for feature, ref in reference['numeric'].items()
+        }
+        self._categories = {
+            feature: list(ref['frequencies']) for feature, ref in reference['categorical'].items()
+        }
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all sketches"""
+        with self._lock:
+            self.count = 0
+            self._hist = {f: np.zeros(len(e) + 1, dtype=np.int64) for f, e in self._edges.items()}
+            self._out_of_range = {f: 0 for f in self._edges}
+            self._sum = {f: 0.0 for f in self._edges}
+            self._seen = {f: dict.fromkeys(c, 0) for f, c in self._categories.items()}
+            self._unseen = {f: {} for f in self._categories}
+            self._unseen_total = {f: 0 for f in self._categories}
+            self._unseen_other = {f: 0 for f in self._categories}
+
+    def update(self, frame):
+        """Add a batch of inputs to the sketches"""
+        numeric = {}
+        for feature, edges in self._edges.items():
+            if feature not in frame:
+                continue
+            values = pd.to_numeric(frame[feature], errors='coerce').to_numpy(dtype=float)
+            values = values[~np.isnan(values)]
+            ref = self.reference['numeric'][feature]
+            numeric[feature] = (
+                _bin_counts(values, edges),
+                int(np.count_nonzero((values < ref['min']) | (values > ref['max']))),
+                float(values.sum())
+            )
+        categorical = {
+            feature: frame[feature].astype(str).value_counts()
+            for feature in self._categories if feature in frame
+        }
+
+        with self._lock:
+            self.count += len(frame)
+            for feature, (counts, out_of_range, total) in numeric.items():
+                self._hist[feature] += counts
+                self._out_of_range[feature] += out_of_range
+                self._sum[feature] += total
+            for feature, counts in categorical.items():
+                seen = self._seen[feature]
+                unseen = self._unseen[feature]
+                for value, count in counts.items():
+                    if value in seen:
+                        seen[value] += count
+                        continue
+                    self._unseen_total[feature] += count
+                    if value in unseen or len(unseen) < MAX_UNSEEN:
+                        unseen[value] = unseen.get(value, 0) + count
+                    else:
+                        self._unseen_other[feature] += count
+
+    def report(self):
+        """Drift scores per feature"""
+        with self._lock:
+            numeric = {}
+            for feature, hist in self._hist.items():
+                observed = int(hist.sum())
+                ref = self.reference['numeric'][feature]
+                min_rows = MIN_ROWS_PER_BIN * len(hist)
+                score = None
+                if observed >= min_rows:
+                    score = psi(hist / observed, ref['proportions'])
+                entry = {
+                    'count': observed,
+                    'min_rows': min_rows,
+                    'psi': score,
+                    'status': _status(score),
+                    'reference_mean': ref['mean']
+                }
+                if observed:
+                    entry.update({
+                        'mean': self._sum[feature] / observed,
+                        'out_of_range_rate': self._out_of_range[feature] / observed
+                    })
+                numeric[feature] = entry
+
+            categorical = {}
+            for feature, seen in self._seen.items():
+                unseen_total = self._unseen_total[feature]
+                observed = sum(seen.values()) + unseen_total
+                frequencies = self.reference['categorical'][feature]['frequencies']
+                # Unseen values form one extra category with no reference mass
+                min_rows = MIN_ROWS_PER_BIN * (len(frequencies) + 1)
+                score = None
+                if observed >= min_rows:
+                    score = psi(
+                        np.array([seen[c] for c in frequencies] + [unseen_total]) / observed,
+                        list(frequencies.values()) + [0.0]
+                    )
+                entry = {
+                    'count': observed,
+                    'min_rows': min_rows,
+                    'psi': score,
+                    'status': _status(score)
+                }
+                if observed:
+                    top = sorted(self._unseen[feature].items(), key=lambda kv: -kv[1])
+                    entry.update({
+                        'unseen_rate': unseen_total / observed,
+                        'top_unseen': dict(top[:10]),
+                        'unseen_untracked': self._unseen_other[feature]
+                    })
+                categorical[feature] = entry
+
+            return {
+                'observed_rows': self.count,
+                'reference_rows': self.reference['rows'],
+                'numeric': numeric,
+                'categorical': categorical
+            }
+
+def load_monitors(model_dir, names):
+    """Drift monitors for the models that have a reference snapshot"""
+    monitors = {}
+    for name in names:
+        path = reference_path(model_dir, name)
+        if os.path.exists(path):
+            with open(path) as f:
+                monitors[name] = DriftMonitor(json.load(f))
+    return monitors
@@ -0,0 +1,260 @@
+"""
+Parallel k-fold evaluation of the training candidates
+
+Every (candidate, fold) pair is fitted in a worker process. Workers open the
+memory-mapped dataset snapshot built by dataset.py themselves, so the data is
+shared through the page cache instead of being pickled to each process; only
+the out-of-fold predictions are sent back. From those the parent computes
+fold and overall metrics plus per-slice metrics (per crop and per state for
+yield, per class for crop recommendation).
+
+The saved model artifacts are then measured for size and for inference
+latency per batch size, and everything is written as JSON next to them in
+models/evaluation_report.json.
+"""
+import json
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.metrics import (accuracy_score, classification_report, mean_absolute_error,
+                             mean_squared_error, r2_score)
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+
+import dataset
+from compact_forest import compact_path, load_model, sklearn_tree_bytes
+
+MODEL_DIR = 'models'
+REPORT_NAME = 'evaluation_report.json'
+DEFAULT_FOLDS = 5
+LATENCY_BATCH_SIZES = [1, 10, 100, 1000, 10000]
+# Time spent timing each artifact and batch size
+LATENCY_SECONDS = 0.5
+MIN_LATENCY_RUNS = 5
+RANDOM_STATE = 42
+
+# Dataset snapshot opened once per worker process
+_worker_data = None
+
+def _init_worker(snapshot):
+    global _worker_data
+    _worker_data = dataset.open_snapshot(snapshot)
+
+def _fold_split(data, task):
+    """Train and test row indices of one fold"""
+    y = data['columns'][task['target']]
+    if task['classifier']:
+        folds = StratifiedKFold(task['folds'], shuffle=True, random_state=RANDOM_STATE)
+    else:
+        folds = KFold(task['folds'], shuffle=True, random_state=RANDOM_STATE)
+    for fold, split in enumerate(folds.split(np.zeros(len(y)), y)):
+        if fold == task['fold']:
+            return split
+
+def _rows(data, features, index):
+    """Feature matrix of selected rows, read from the memory-mapped columns"""
+    columns = data['columns']
+    return np.column_stack([np.asarray(columns[c])[index] for c in features]).astype(np.float32)
+
+def _run_fold(task):
+    """Fit one candidate on one fold and predict the held-out rows"""
+    data = _worker_data
+    train, test = _fold_split(data, task)
+    y = np.asarray(data['columns'][task['target']])
+
+    # Only the fold's rows are materialized; the snapshot stays memory-mapped
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(_rows(data, task['features'], train))
+    X_test = scaler.transform(_rows(data, task['features'], test))
+
+    # Parallelism comes from the worker pool, so each fit is single-threaded
+    model = task['estimator'](**{**task['params'], 'n_jobs': 1})
+    start = time.perf_counter()
+    model.fit(X_train, y[train])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted = model.predict(X_test)
+    predict_seconds = time.perf_counter() - start
+
+    return {
+        'candidate': task['candidate'],
+        'fold': task['fold'],
+        'test_index': test,
+        'predicted': predicted,
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds
+    }
+
+def run_folds(data, tasks, workers):
+    """Run fold tasks in a process pool, or inline with a single worker"""
+    if workers <= 1:
+        _init_worker(data['path'])
+        return [_run_fold(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(data['path'],)) as pool:
+        return list(pool.map(_run_fold, tasks))
+
+def regression_metrics(y, predicted):
+    """R², RMSE and MAE, with R² left out for fewer than two rows"""
+    return {
+        'rows': int(len(y)),
+        'r2': float(r2_score(y, predicted)) if len(y) > 1 and np.ptp(y) > 0 else None,
+        'rmse': float(np.sqrt(mean_squared_error(y, predicted))),
+        'mae': float(mean_absolute_error(y, predicted))
+    }
+
+def slice_metrics(data, column, y, predicted):
+    """Regression metrics per category of a column"""
+    codes = pd.Series(np.asarray(data['columns'][column]))
+    labels = data['categories'][column]
+    return {
+        labels[code]: regression_metrics(y[index], predicted[index])
+        for code, index in codes.groupby(codes).indices.items()
+    }
+
+def summarize_candidate(data, config, results):
+    """Fold, overall and per-slice metrics of one candidate's predictions"""
+    y = np.asarray(data['columns'][config['target']])
+    predicted = np.empty(len(y), dtype=np.float64)
+    folds = []
+    for result in sorted(results, key=lambda r: r['fold']):
+        index = result['test_index']
+        predicted[index] = result['predicted']
+        if config['classifier']:
+            metrics = {'rows': int(len(index)),
+                       'accuracy': float(accuracy_score(y[index], result['predicted']))}
+        else:
+            metrics = regression_metrics(y[index], result['predicted'])
+        folds.append({
+            'fold': result['fold'],
+            **metrics,
+            'fit_seconds': result['fit_seconds'],
+            'predict_seconds': result['predict_seconds']
+        })
+
+    summary = {'folds': folds}
+    if config['classifier']:
+        labels = data['categories'][config['target']]
+        summary['accuracy'] = float(accuracy_score(y, predicted))
+        summary['per_class'] = classification_report(
+            y, predicted, labels=np.arange(len(labels)), target_names=labels,
+            output_dict=True, zero_division=0
+        )
+    else:
+        summary.update(regression_metrics(y, predicted))
+        summary['slices'] = {
+            column: slice_metrics(data, column, y, predicted)
+            for column in config['slices']
+        }
+    return summary
+
+def measure_latency(model, X, batch_sizes=LATENCY_BATCH_SIZES, seconds=LATENCY_SECONDS):
+    """Inference latency percentiles (ms) and throughput per batch size"""
+    rng = np.random.default_rng(RANDOM_STATE)
+    predict = model.predict_proba if hasattr(model, 'classes_') else model.predict
+    latency = {}
+    for batch_size in batch_sizes:
+        batch = X[rng.integers(0, len(X), batch_size)]
+        timings = []
+        deadline = time.perf_counter() + seconds
+        while len(timings) < MIN_LATENCY_RUNS or time.perf_counter() < deadline:
+            start = time.perf_counter()
+            predict(batch)
+            timings.append(time.perf_counter() - start)
+        p50 = float(np.percentile(timings, 50))
+        latency[str(batch_size)] = {
+            'runs': len(timings),
+            'p50_ms': p50 * 1000,
+            'p95_ms': float(np.percentile(timings, 95)) * 1000,
+            'throughput_rps': batch_size / p50 if p50 > 0 else None
+        }
+    return latency
+
+def artifact_report(name, X, model_dir=MODEL_DIR):
+    """Size and latency of a saved model and of its compact export, if any"""
+    report = {}
+    for compact, path in ((False, os.path.join(model_dir, name + '.pkl')),
+                          (True, compact_path(name, model_dir))):
+        if not os.path.exists(path):
+            continue
+        model = load_model(name, model_dir, compact=compact)
+        report[os.path.basename(path)] = {
+            'file_bytes': os.path.getsize(path),
+            'memory_bytes': model.nbytes if compact else sklearn_tree_bytes(model),
+            'latency': measure_latency(model, X)
+        }
+    return report
+
+def evaluate(configs, folds=DEFAULT_FOLDS, workers=None, model_dir=MODEL_DIR):
+    """
+    Evaluate each model's candidates and write the report next to the models
+
+    configs maps a model name to its 'data' (from dataset.load_dataset),
+    'features', 'target', 'classifier' flag, 'slices' columns, 'artifact'
+    name and 'candidates' (name -> (estimator class, params)).
+    """
+    workers = workers or os.cpu_count() or 1
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'folds': folds,
+        'workers': workers,
+        'environment': {
+            'python': platform.python_version(),
+            'sklearn': sklearn.__version__,
+            'numpy': np.__version__
+        },
+        'models': {}
+    }
+
+    for name, config in configs.items():
+        data = config['data']
+        print(f"Evaluating {name}: {len(config['candidates'])} candidate(s), "
+              f"{folds} folds, {workers} worker(s)...")
+        tasks = [
+            {
+                'candidate': candidate,
+                'estimator': estimator,
+                'params': params,
+                'fold': fold,
+                'folds': folds,
+                'features': config['features'],
+                'target': config['target'],
+                'classifier': config['classifier']
+            }
+            for candidate, (estimator, params) in config['candidates'].items()
+            for fold in range(folds)
+        ]
+        start = time.perf_counter()
+        results = run_folds(data, tasks, workers)
+
+        candidates = {}
+        for candidate, (estimator, params) in config['candidates'].items():
+            summary = summarize_candidate(
+                data, config, [r for r in results if r['candidate'] == candidate]
+            )
+            candidates[candidate] = {'estimator': estimator.__name__, 'params': params, **summary}
+            score = summary['accuracy'] if config['classifier'] else summary['r2']
+            print(f"  {candidate}: {'accuracy' if config['classifier'] else 'R²'} {score:.4f}")
+
+        # Latency is measured serially so timings are not skewed by other workers
+        X = dataset.to_frame(data, config['features'], codes=True)
+        scaler = joblib.load(os.path.join(model_dir, config['scaler']))
+        report['models'][name] = {
+            'dataset': {'snapshot': data['path'], 'rows': data['rows']},
+            'evaluation_seconds': time.perf_counter() - start,
+            'candidates': candidates,
+            'artifacts': artifact_report(config['artifact'], scaler.transform(X), model_dir)
+        }
+
+    path = os.path.join(model_dir, REPORT_NAME)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Evaluation report saved to {path}")
+    return report
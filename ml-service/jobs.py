@@ -0,0 +1,353 @@
+"""
+Asynchronous bulk prediction jobs
+
+A submitted job is spooled to its own directory under ML_JOB_DIR (the input
+rows, a status.json and, once running, results.jsonl) and its ID is put on a
+bounded queue. Worker threads take job IDs from the queue, score the input
+chunk by chunk with the scorer registered for the job type, append each
+chunk's results to disk and update the progress in status.json, so status
+and results can be served by any process sharing the directory.
+
+The queue is pluggable: ML_JOB_QUEUE names a registered backend ('local', an
+in-process bounded queue needing no external services, is the default) or a
+'module:Class' implementing the QueueBackend interface.
+
+Each job records the host and process that queued or is running it. On
+startup the manager requeues jobs left queued by a process that has exited
+(unless the backend is durable) and fails the ones it was running.
+"""
+import importlib
+import json
+import os
+import queue
+import shutil
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+import pandas as pd
+
+JOB_DIR = 'jobs'
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_CHUNK_ROWS = 10000
+DEFAULT_KEEP = 100
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+INPUT_FILE = 'input.pkl'
+STATUS_FILE = 'status.json'
+RESULTS_FILE = 'results.jsonl'
+
+class QueueFull(Exception):
+    """Raised when a job cannot be queued because the queue is at capacity"""
+
+class QueueBackend:
+    """Interface of a job queue carrying job IDs"""
+
+    # Whether queued IDs survive a restart; if not, they are requeued on startup
+    durable = False
+
+    def put(self, job_id):
+        """Enqueue a job ID without blocking, raising QueueFull at capacity"""
+        raise NotImplementedError
+
+    def get(self, timeout):
+        """Next job ID, or None if none arrives within timeout seconds"""
+        raise NotImplementedError
+
+    def size(self):
+        """Number of queued job IDs"""
+        raise NotImplementedError
+
+class LocalQueue(QueueBackend):
+    """Bounded in-process queue"""
+
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, job_id):
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            raise QueueFull(f'Job queue is full ({self._queue.maxsize} jobs)')
+
+    def get(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def size(self):
+        return self._queue.qsize()
+
+BACKENDS = {'local': LocalQueue}
+
+def create_backend(name='local', maxsize=DEFAULT_QUEUE_SIZE):
+    """Queue backend by registered name or 'module:Class' path"""
+    if name in BACKENDS:
+        backend = BACKENDS[name]
+    elif ':' in name:
+        module, cls = name.split(':', 1)
+        backend = getattr(importlib.import_module(module), cls)
+    else:
+        raise ValueError(f'Unknown job queue backend: {name}')
+    return backend(maxsize=maxsize)
+
+def _owner():
+    """Host and process recorded on the jobs this process queues or runs"""
+    return {'host': socket.gethostname(), 'pid': os.getpid()}
+
+def _owner_exited(owner):
+    """Whether a job's owning process has exited; never assumed for other hosts"""
+    if owner is None:
+        return True
+    if owner['host'] != socket.gethostname() or os.name == 'nt':
+        # os.kill cannot probe a process on Windows without terminating it
+        return False
+    if owner['pid'] == os.getpid():
+        # An earlier process with our PID, e.g. PID 1 of a restarted container
+        return True
+    try:
+        os.kill(owner['pid'], 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+class JobManager:
+    """Spools bulk jobs to disk and runs them on a pool of worker threads"""
+
+    def __init__(self, scorers, backend=None, directory=JOB_DIR, workers=DEFAULT_WORKERS,
+                 chunk_rows=DEFAULT_CHUNK_ROWS, keep=DEFAULT_KEEP):
+        self.scorers = scorers
+        self.backend = backend or LocalQueue()
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.keep = keep
+        self._lock = threading.Lock()
+        # Jobs being executed by a worker of this process
+        self._active = set()
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+        self._workers = [
+            threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _path(self, job_id, name=''):
+        return os.path.join(self.directory, os.path.basename(job_id), name)
+
+    def _write_status(self, job_id, status):
+        """Replace a job's status file atomically"""
+        path = self._path(job_id, STATUS_FILE)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(status, f, indent=2)
+        os.replace(tmp, path)
+
+    def _update(self, job_id, **changes):
+        """Update a running job's status; no-op once it is cancelled or removed"""
+        with self._lock:
+            status = self.status(job_id)
+            if status is None or status['state'] != RUNNING:
+                return None
+            status.update(changes)
+            self._write_status(job_id, status)
+            return status
+
+    def status(self, job_id):
+        """Status of a job, or None if it does not exist"""
+        # The job may be deleted or pruned between any check and the read
+        try:
+            with open(self._path(job_id, STATUS_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def results_path(self, job_id):
+        """Path of a job's spooled results"""
+        return self._path(job_id, RESULTS_FILE)
+
+    def submit(self, job_type, input_df):
+        """Spool a job's input and queue it; raises QueueFull at capacity"""
+        if job_type not in self.scorers:
+            raise ValueError(f'Unknown job type: {job_type}')
+        self._prune()
+
+        job_id = uuid.uuid4().hex
+        os.makedirs(self._path(job_id))
+        input_df.to_pickle(self._path(job_id, INPUT_FILE))
+        status = {
+            'job_id': job_id,
+            'type': job_type,
+            'state': QUEUED,
+            'total_rows': len(input_df),
+            'processed_rows': 0,
+            'progress': 0.0,
+            'created': time.time(),
+            'started': None,
+            'finished': None,
+            'error': None,
+            'owner': _owner()
+        }
+        self._write_status(job_id, status)
+
+        try:
+            self.backend.put(job_id)
+        except QueueFull:
+            shutil.rmtree(self._path(job_id), ignore_errors=True)
+            raise
+        return status
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; running jobs stop after their current chunk"""
+        with self._lock:
+            status = self.status(job_id)
+            if status is not None and status['state'] not in FINISHED:
+                if status['state'] == QUEUED:
+                    os.remove(self._path(job_id, INPUT_FILE))
+                status.update(state=CANCELLED, finished=time.time())
+                self._write_status(job_id, status)
+            return status
+
+    def delete(self, job_id):
+        """Remove a finished job and its files, unless its worker is still stopping"""
+        with self._lock:
+            status = self.status(job_id)
+            if (status is not None and status['state'] in FINISHED
+                    and job_id not in self._active):
+                shutil.rmtree(self._path(job_id), ignore_errors=True)
+            return status
+
+    def report(self):
+        """Queue depth and job counts by state"""
+        states = {}
+        for job_id in os.listdir(self.directory):
+            status = self.status(job_id)
+            if status is not None:
+                states[status['state']] = states.get(status['state'], 0) + 1
+        return {
+            'queued': self.backend.size(),
+            'workers': len(self._workers),
+            'chunk_rows': self.chunk_rows,
+            'jobs': states
+        }
+
+    def _recover(self):
+        """Requeue or fail the unfinished jobs of processes that have exited"""
+        queued = []
+        for job_id in os.listdir(self.directory):
+            status = self.status(job_id)
+            if (status is None or status['state'] in FINISHED
+                    or not _owner_exited(status.get('owner'))):
+                continue
+            if status['state'] == RUNNING:
+                self._abandon(job_id, status, 'Service restarted while the job was running')
+            elif not os.path.exists(self._path(job_id, INPUT_FILE)):
+                self._abandon(job_id, status, 'Job input is missing')
+            elif not self.backend.durable:
+                queued.append((status['created'], job_id, status))
+
+        for _, job_id, status in sorted(queued):
+            status['owner'] = _owner()
+            self._write_status(job_id, status)
+            try:
+                self.backend.put(job_id)
+            except QueueFull:
+                self._abandon(job_id, status, 'Job queue was full when the service restarted')
+
+    def _abandon(self, job_id, status, error):
+        """Fail an unfinished job that will not run and drop its input"""
+        status.update(state=FAILED, error=error, finished=time.time())
+        self._write_status(job_id, status)
+        input_path = self._path(job_id, INPUT_FILE)
+        if os.path.exists(input_path):
+            os.remove(input_path)
+
+    def _prune(self):
+        """Remove the oldest finished jobs beyond the retention limit"""
+        with self._lock:
+            finished = []
+            for job_id in os.listdir(self.directory):
+                status = self.status(job_id)
+                if (status is not None and status['state'] in FINISHED
+                        and job_id not in self._active):
+                    finished.append((status['finished'], job_id))
+            for _, job_id in sorted(finished)[:-self.keep or None]:
+                shutil.rmtree(self._path(job_id), ignore_errors=True)
+
+    def _run(self):
+        while True:
+            # A failing job must never take its worker down with it
+            try:
+                job_id = self.backend.get(timeout=1.0)
+                if job_id is not None:
+                    self._execute(job_id)
+            except Exception:
+                traceback.print_exc()
+
+    def _execute(self, job_id):
+        """Score a job chunk by chunk, appending results to disk"""
+        with self._lock:
+            status = self.status(job_id)
+            if status is None or status['state'] != QUEUED:
+                return
+            status.update(state=RUNNING, started=time.time(), owner=_owner())
+            self._write_status(job_id, status)
+            self._active.add(job_id)
+
+        try:
+            input_df = pd.read_pickle(self._path(job_id, INPUT_FILE))
+            scorer = self.scorers[status['type']]
+            total = len(input_df)
+            with open(self.results_path(job_id), 'w') as results:
+                for start in range(0, total, self.chunk_rows):
+                    status = self.status(job_id)
+                    if status is None or status['state'] != RUNNING:
+                        return
+                    chunk = input_df.iloc[start:start + self.chunk_rows]
+                    scored = scorer(chunk.reset_index(drop=True))
+                    scored.insert(0, 'row', range(start, start + len(chunk)))
+                    scored.to_json(results, orient='records', lines=True)
+                    results.flush()
+                    if self._update(job_id, processed_rows=start + len(chunk),
+                                    progress=(start + len(chunk)) / total) is None:
+                        return
+
+            self._update(job_id, state=SUCCEEDED, progress=1.0, finished=time.time())
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, state=FAILED, error=str(e), finished=time.time())
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+                input_path = self._path(job_id, INPUT_FILE)
+                if os.path.exists(input_path):
+                    os.remove(input_path)
+
+def init_jobs(scorers):
+    """Job manager configured from the environment"""
+    backend = create_backend(
+        os.getenv('ML_JOB_QUEUE', 'local'),
+        maxsize=int(os.getenv('ML_JOB_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))
+    )
+    return JobManager(
+        scorers,
+        backend=backend,
+        directory=os.getenv('ML_JOB_DIR', JOB_DIR),
+        workers=int(os.getenv('ML_JOB_WORKERS', DEFAULT_WORKERS)),
+        chunk_rows=int(os.getenv('ML_JOB_CHUNK_ROWS', DEFAULT_CHUNK_ROWS)),
+        keep=int(os.getenv('ML_JOB_KEEP', DEFAULT_KEEP))
+    )
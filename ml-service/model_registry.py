@@ -0,0 +1,145 @@
+"""
+Registry of specialised yield models keyed by region and crop
+
+Models are trained per (region, crop), per crop or per region by
+train_models.py and listed in a manifest. They are loaded on first use and
+kept in an LRU cache bounded by a memory budget; the global model is the
+fallback for rows without a specialised model and is never evicted.
+
+Each model is stored as a bundle: a dict with the fitted 'model', its
+'scaler', 'label_encoders' and the ordered 'features' it expects.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import pandas as pd
+
+REGISTRY_DIR = os.path.join('models', 'yield_registry')
+MANIFEST = 'manifest.json'
+GLOBAL_KEY = 'global'
+DEFAULT_MEMORY_MB = 1024
+
+def model_key(region=None, crop=None):
+    """Registry key of a model specialised to a region and/or crop"""
+    parts = []
+    if region is not None:
+        parts.append(f'region={region}')
+    if crop is not None:
+        parts.append(f'crop={crop}')
+    return ','.join(parts) or GLOBAL_KEY
+
+def save_bundle(registry_dir, key, bundle, **info):
+    """Write one model bundle and return its manifest entry"""
+    os.makedirs(registry_dir, exist_ok=True)
+    filename = ''.join(c if c.isalnum() or c in '=-' else '_' for c in key) + '.pkl'
+    path = os.path.join(registry_dir, filename)
+    joblib.dump(bundle, path)
+    return {'path': filename, 'bytes': os.path.getsize(path), **info}
+
+def write_manifest(registry_dir, entries):
+    """Write the manifest of all bundles in a registry directory"""
+    os.makedirs(registry_dir, exist_ok=True)
+    with open(os.path.join(registry_dir, MANIFEST), 'w') as f:
+        json.dump(entries, f, indent=2, sort_keys=True)
+
+class ModelRegistry:
+    """Lazily loaded, memory-bounded set of yield models with a global fallback"""
+
+    def __init__(self, global_bundle, registry_dir=REGISTRY_DIR,
+                 memory_budget=DEFAULT_MEMORY_MB * 2 ** 20):
+        self.registry_dir = registry_dir
+        self.memory_budget = memory_budget
+        self.global_bundle = {**global_bundle, 'key': GLOBAL_KEY}
+        self.entries = {}
+
+        manifest = os.path.join(registry_dir, MANIFEST)
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                self.entries = json.load(f)
+
+        self._resident = OrderedDict()
+        self._resident_bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.stats = {'hits': 0, 'misses': 0, 'loads': 0, 'evictions': 0}
+
+    def resolve_keys(self, regions, crops):
+        """
+        Most specific registered model key for each row
+
+        Lookup order is (region, crop), crop, region, then the global model.
+        """
+        n = len(regions)
+        if not self.entries:
+            return np.full(n, GLOBAL_KEY, dtype=object)
+
+        regions = pd.Series(np.asarray(regions, dtype=object)).astype(str)
+        crops = pd.Series(np.asarray(crops, dtype=object)).astype(str)
+        available = list(self.entries)
+
+        keys = np.full(n, GLOBAL_KEY, dtype=object)
+        for candidates in (
+            'region=' + regions,
+            'crop=' + crops,
+            'region=' + regions + ',crop=' + crops
+        ):
+            # Later candidates are more specific and take precedence
+            found = candidates.isin(available).to_numpy()
+            keys[found] = candidates.to_numpy()[found]
+        return keys
+
+    def get(self, key):
+        """Bundle for a key, loading it and evicting cold models as needed"""
+        if key not in self.entries:
+            return self.global_bundle
+
+        with self._lock:
+            if key in self._resident:
+                self._resident.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._resident[key]
+            self.stats['misses'] += 1
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other models stay available
+        with load_lock:
+            with self._lock:
+                if key in self._resident:
+                    return self._resident[key]
+
+            entry = self.entries[key]
+            bundle = joblib.load(os.path.join(self.registry_dir, entry['path']))
+            bundle['key'] = key
+
+            with self._lock:
+                self._resident[key] = bundle
+                self._resident_bytes += entry['bytes']
+                self.stats['loads'] += 1
+                self._evict(keep=key)
+            return bundle
+
+    def _evict(self, keep):
+        """Evict least recently used models until within the memory budget"""
+        while self._resident_bytes > self.memory_budget and len(self._resident) > 1:
+            key = next(iter(self._resident))
+            if key == keep:
+                self._resident.move_to_end(key)
+                continue
+            del self._resident[key]
+            self._resident_bytes -= self.entries[key]['bytes']
+            self.stats['evictions'] += 1
+
+    def report(self):
+        """Registered and resident models with load/evict counts"""
+        with self._lock:
+            return {
+                'registered': len(self.entries),
+                'resident': list(self._resident),
+                'resident_mb': self._resident_bytes / 2 ** 20,
+                'memory_budget_mb': self.memory_budget / 2 ** 20,
+                **self.stats
+            }
@@ -0,0 +1,261 @@
+"""
+Opt-in request profiling for the ML service
+
+Two complementary modes, configured from the environment:
+
+- ML_PROFILE_SAMPLE_RATE: fraction of requests run under cProfile
+- ML_PROFILE_SLOW_MS: requests slower than this are captured by a background
+  stack sampler (every ML_PROFILE_INTERVAL_MS) that records where the request
+  thread spent its time
+
+Each capture records the endpoint, batch size, wall and CPU time (a low CPU
+share points at GIL contention or I/O) and the time per package (pandas,
+sklearn, flask, ...). Captures are written as JSON to ML_PROFILE_DIR, keeping
+the newest ML_PROFILE_KEEP, and listed at /api/ml/profiles. When neither mode
+is enabled no hooks are installed.
+"""
+import cProfile
+import json
+import os
+import pstats
+import random
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+
+from flask import abort, g, jsonify, request
+
+PROFILE_DIR = 'profiles'
+DEFAULT_KEEP = 200
+DEFAULT_INTERVAL_MS = 5
+TOP_N = 30
+
+STDLIB_DIR = sysconfig.get_paths()['stdlib']
+
+def _package(filename):
+    """Top-level package a source file belongs to"""
+    if filename == '~':
+        # cProfile's marker for C functions and builtin methods
+        return 'builtins'
+    parts = filename.replace('\\', '/').split('/')
+    for marker in ('site-packages', 'dist-packages'):
+        if marker in parts:
+            index = parts.index(marker) + 1
+            if index < len(parts):
+                return parts[index].split('.')[0]
+    if filename.startswith(STDLIB_DIR) or filename.startswith('<'):
+        return 'stdlib'
+    return 'app'
+
+def _batch_size(data):
+    """Number of rows a request body asks to score, or None if malformed"""
+    if isinstance(data, dict):
+        if isinstance(data.get('samples'), list):
+            return len(data['samples'])
+        if isinstance(data.get('sweep'), list):
+            size = 1
+            for spec in data['sweep']:
+                # Bodies are unvalidated here; never let them fail the response
+                if not isinstance(spec, dict):
+                    return None
+                try:
+                    size *= len(spec.get('values') or []) or int(spec.get('steps', 50))
+                except (TypeError, ValueError):
+                    return None
+            return size
+    return 1
+
+class StackSampler:
+    """Background thread sampling the stacks of in-flight request threads"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+
+    def start(self, thread_id):
+        """Begin collecting samples for a request thread"""
+        with self._lock:
+            self._active[thread_id] = Counter()
+
+    def stop(self, thread_id):
+        """Stop collecting and return the collapsed stack counts"""
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f'{code.co_filename}:{code.co_name}')
+                        frame = frame.f_back
+                    if stack:
+                        stacks[';'.join(reversed(stack))] += 1
+
+class RequestProfiler:
+    """Flask hooks capturing sampled and slow request profiles"""
+
+    def __init__(self, app, sample_rate=0.0, slow_ms=0.0, directory=PROFILE_DIR,
+                 keep=DEFAULT_KEEP, interval_ms=DEFAULT_INTERVAL_MS):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.directory = directory
+        self.keep = keep
+        self.interval = interval_ms / 1000
+        self.sampler = StackSampler(self.interval) if slow_ms > 0 else None
+        self._write_lock = threading.Lock()
+        # Only one thread can run cProfile at a time
+        self._cprofile_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.add_url_rule('/api/ml/profiles', 'list_profiles', self.list_profiles)
+        app.add_url_rule('/api/ml/profiles/<name>', 'get_profile', self.get_profile)
+
+    def before_request(self):
+        if request.path.startswith('/api/ml/profiles'):
+            return
+        g.profile_start = time.perf_counter()
+        g.profile_cpu_start = time.thread_time()
+        g.profile_thread = threading.get_ident()
+        g.profiler = None
+        if (self.sample_rate > 0 and random.random() < self.sample_rate
+                and self._cprofile_lock.acquire(blocking=False)):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+        elif self.sampler is not None:
+            self.sampler.start(g.profile_thread)
+
+    def after_request(self, response):
+        if 'profile_start' not in g:
+            return response
+
+        wall_ms = (time.perf_counter() - g.profile_start) * 1000
+        cpu_ms = (time.thread_time() - g.profile_cpu_start) * 1000
+        capture = None
+
+        if g.profiler is not None:
+            g.profiler.disable()
+            self._cprofile_lock.release()
+            capture = self._cprofile_summary(g.profiler)
+            g.profiler = None
+        elif self.sampler is not None:
+            stacks = self.sampler.stop(g.profile_thread)
+            if wall_ms >= self.slow_ms:
+                capture = self._sampler_summary(stacks)
+
+        if capture is not None:
+            capture.update({
+                'endpoint': request.endpoint,
+                'path': request.path,
+                'status': response.status_code,
+                'batch_size': _batch_size(request.get_json(silent=True)),
+                'wall_ms': wall_ms,
+                'cpu_ms': cpu_ms,
+                'cpu_share': cpu_ms / wall_ms if wall_ms > 0 else None,
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S')
+            })
+            self._write(capture)
+        return response
+
+    def teardown_request(self, exc):
+        """Release profiling state of requests that ended in an exception"""
+        if g.get('profiler') is not None:
+            g.profiler.disable()
+            self._cprofile_lock.release()
+            g.profiler = None
+        if self.sampler is not None and 'profile_thread' in g:
+            self.sampler.stop(g.profile_thread)
+
+    def _cprofile_summary(self, profiler):
+        """Top functions and per-package self time of a cProfile run"""
+        stats = pstats.Stats(profiler).stats
+        packages = Counter()
+        functions = []
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.items():
+            packages[_package(filename)] += tottime * 1000
+            functions.append({
+                'function': f'{filename}:{line}({name})',
+                'calls': calls,
+                'self_ms': tottime * 1000,
+                'cumulative_ms': cumtime * 1000
+            })
+        functions.sort(key=lambda f: f['cumulative_ms'], reverse=True)
+        return {
+            'mode': 'cprofile',
+            'packages_ms': dict(packages.most_common()),
+            'functions': functions[:TOP_N]
+        }
+
+    def _sampler_summary(self, stacks):
+        """Hot stacks and per-package time of a sampled request"""
+        packages = Counter()
+        for stack, count in stacks.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            packages[_package(leaf.rsplit(':', 1)[0])] += count * self.interval * 1000
+        return {
+            'mode': 'sampler',
+            'interval_ms': self.interval * 1000,
+            'samples': sum(stacks.values()),
+            'packages_ms': dict(packages.most_common()),
+            'stacks': [
+                {'stack': stack, 'samples': count}
+                for stack, count in stacks.most_common(TOP_N)
+            ]
+        }
+
+    def _write(self, capture):
+        """Write a capture, removing the oldest beyond the retention limit"""
+        now = time.time()
+        name = (f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now * 1000) % 1000:03d}"
+                f"-{capture['endpoint']}-{os.urandom(3).hex()}.json")
+        with self._write_lock:
+            with open(os.path.join(self.directory, name), 'w') as f:
+                json.dump(capture, f, indent=2)
+            files = sorted(f for f in os.listdir(self.directory) if f.endswith('.json'))
+            for old in files[:-self.keep]:
+                os.remove(os.path.join(self.directory, old))
+
+    def list_profiles(self):
+        """Stored captures, newest first"""
+        files = sorted(
+            (f for f in os.listdir(self.directory) if f.endswith('.json')), reverse=True
+        )
+        return jsonify({'profiles': files})
+
+    def get_profile(self, name):
+        """One stored capture"""
+        path = os.path.join(self.directory, os.path.basename(name))
+        if not os.path.exists(path):
+            abort(404)
+        with open(path) as f:
+            return jsonify(json.load(f))
+
+def init_profiling(app):
+    """Install request profiling if enabled in the environment"""
+    sample_rate = float(os.getenv('ML_PROFILE_SAMPLE_RATE', 0))
+    slow_ms = float(os.getenv('ML_PROFILE_SLOW_MS', 0))
+    if sample_rate <= 0 and slow_ms <= 0:
+        return None
+    return RequestProfiler(
+        app,
+        sample_rate=sample_rate,
+        slow_ms=slow_ms,
+        directory=os.getenv('ML_PROFILE_DIR', PROFILE_DIR),
+        keep=int(os.getenv('ML_PROFILE_KEEP', DEFAULT_KEEP)),
+        interval_ms=float(os.getenv('ML_PROFILE_INTERVAL_MS', DEFAULT_INTERVAL_MS))
+    )
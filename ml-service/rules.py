@@ -0,0 +1,171 @@
+"""
+Data-driven interpretation rules for ML predictions
+
+Rules are tables of thresholds and ranges evaluated with NumPy over whole
+batches. Evaluation returns integer category codes; codes are expanded to
+label strings only when a response is serialized.
+
+Rule sets can be overridden per crop or region from a JSON file:
+
+{
+    "crop:rice": {"soil": {"ranges": {"nitrogen": {"range": [60, 120]}}}},
+    "region:Punjab": {"yield": {"bins": [20000, 40000, 60000]}}
+}
+
+Overrides only adjust thresholds and ranges. Labels and the features soil
+ranges read always come from the default rule set so that a code means the
+same thing across a batch.
+"""
+import copy
+import json
+
+import numpy as np
+import pandas as pd
+
+# Threshold tables classify a value into labels[i] when it exceeds bins[i - 1]
+# and does not exceed bins[i] (np.digitize with right=True)
+DEFAULT_RULES = {
+    'yield': {
+        'bins': [15000, 30000, 50000],
+        'labels': [
+            'Below average yield expected',
+            'Average yield expected',
+            'Good yield expected',
+            'Excellent yield expected'
+        ]
+    },
+    'suitability': {
+        'bins': [0.4, 0.6, 0.8],
+        'labels': [
+            'Less Suitable',
+            'Moderately Suitable',
+            'Suitable',
+            'Highly Suitable'
+        ]
+    },
+    # Soil readings are optimal inside the inclusive [low, high] range
+    'soil': {
+        'ranges': {
+            'nitrogen': {'feature': 'N', 'range': [20, 100]},
+            'phosphorus': {'feature': 'P', 'range': [10, 80]},
+            'potassium': {'feature': 'K', 'range': [10, 60]},
+            'ph': {'feature': 'ph', 'range': [5.5, 7.5]}
+        },
+        'labels': ['Optimal', 'Needs adjustment']
+    },
+    # Overall soil condition by the number of readings needing adjustment
+    'soil_overall': {
+        'bins': [1, 2],
+        'labels': [
+            'Good',
+            'Fair - Some adjustments needed',
+            'Poor - Multiple adjustments needed'
+        ]
+    }
+}
+
+def merge_rules(base, override):
+    """Recursively merge an override into a copy of a rule set"""
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_rules(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+def _check_override(key, override, base):
+    """Reject overrides that would change labels or add unknown entries"""
+    for name, value in override.items():
+        if name == 'labels':
+            raise ValueError(f'Rule override {key} may not change labels')
+        if name == 'feature':
+            raise ValueError(f'Rule override {key} may not change the feature a soil range reads')
+        if name not in base:
+            raise ValueError(f'Rule override {key} has unknown entry: {name}')
+        if isinstance(value, dict):
+            _check_override(key, value, base[name])
+
+def load_rules(path=None):
+    """Load the default rule set plus per-crop/per-region overrides"""
+    rule_sets = {'default': DEFAULT_RULES}
+    if not path:
+        return rule_sets
+
+    with open(path) as f:
+        overrides = json.load(f)
+
+    for key, override in overrides.items():
+        if not key.startswith(('crop:', 'region:')):
+            raise ValueError(f"Rule set key must start with 'crop:' or 'region:': {key}")
+        _check_override(key, override, DEFAULT_RULES)
+        rule_sets[key] = override
+
+    return rule_sets
+
+def resolve_rules(rule_sets, crop=None, region=None):
+    """Rule set for one crop/region: default, then region, then crop overrides"""
+    rules = rule_sets['default']
+    for key in (f'region:{region}', f'crop:{crop}'):
+        if key in rule_sets:
+            rules = merge_rules(rules, rule_sets[key])
+    return rules
+
+def _rule_groups(rule_sets, n, crops=None, regions=None):
+    """Split batch rows into groups sharing the same resolved rule set"""
+    if len(rule_sets) == 1:
+        return [(rule_sets['default'], slice(None))]
+
+    keys = pd.DataFrame({
+        'crop': pd.Series(crops if crops is not None else [None] * n, dtype=object),
+        'region': pd.Series(regions if regions is not None else [None] * n, dtype=object)
+    })
+    # Rows without an override share the default group
+    keys['crop'] = keys['crop'].where(('crop:' + keys['crop'].astype(str)).isin(list(rule_sets)))
+    keys['region'] = keys['region'].where(('region:' + keys['region'].astype(str)).isin(list(rule_sets)))
+
+    groups = keys.groupby(['crop', 'region'], dropna=False, sort=False).indices
+    return [
+        (resolve_rules(rule_sets, *(None if pd.isna(k) else k for k in key)), index)
+        for key, index in groups.items()
+    ]
+
+def classify(rule_sets, table, values, crops=None, regions=None):
+    """Category codes of values against a threshold table"""
+    values = np.asarray(values, dtype=float)
+    codes = np.zeros(len(values), dtype=np.uint8)
+    for rules, index in _rule_groups(rule_sets, len(values), crops, regions):
+        codes[index] = np.digitize(values[index], rules[table]['bins'], right=True)
+    return codes
+
+def analyze_soil(rule_sets, frame, crops=None, regions=None):
+    """
+    Soil reading codes for a batch
+
+    Returns (names, codes, overall) where codes is an (n, len(names)) matrix
+    of 'soil' label codes and overall is an array of 'soil_overall' codes.
+    Missing readings are treated as 0.
+    """
+    names = list(rule_sets['default']['soil']['ranges'])
+    n = len(frame)
+    low = np.empty((n, len(names)))
+    high = np.empty((n, len(names)))
+    readings = np.zeros((n, len(names)))
+
+    for j, name in enumerate(names):
+        feature = rule_sets['default']['soil']['ranges'][name]['feature']
+        if feature in frame:
+            readings[:, j] = pd.to_numeric(frame[feature]).fillna(0).to_numpy(dtype=float)
+
+    for rules, index in _rule_groups(rule_sets, n, crops, regions):
+        ranges = rules['soil']['ranges']
+        low[index] = [ranges[name]['range'][0] for name in names]
+        high[index] = [ranges[name]['range'][1] for name in names]
+
+    codes = ((readings < low) | (readings > high)).astype(np.uint8)
+    overall = classify(rule_sets, 'soil_overall', codes.sum(axis=1), crops, regions)
+    return names, codes, overall
+
+def expand(rule_sets, table, codes):
+    """Expand category codes to label strings"""
+    return np.asarray(rule_sets['default'][table]['labels'], dtype=object)[codes]
@@ -0,0 +1,72 @@
+"""
+Fast JSON responses for the ML service
+
+Responses are encoded with orjson when it is installed, which serializes NumPy
+arrays directly, and fall back to the standard library otherwise. Bodies are
+compressed with br or gzip as negotiated from the request's Accept-Encoding.
+"""
+import gzip
+import json
+
+import numpy as np
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:  # Optional - falls back to the json module
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional - gzip is used instead
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+def _default(obj):
+    """Serialize NumPy values the encoder does not handle natively"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+def dumps(payload):
+    """Encode a payload to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode()
+
+def negotiate_encoding(accept_encodings):
+    """Pick the best supported content encoding, or None for identity"""
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = max(candidates, key=accept_encodings.quality)
+    return best if accept_encodings.quality(best) > 0 else None
+
+def compress(body, encoding):
+    """Compress a body with the given content encoding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def json_response(payload, status=200):
+    """Build a JSON response, compressed when the client accepts it"""
+    body = dumps(payload)
+    response = Response(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+
+    if len(body) >= MIN_COMPRESS_BYTES:
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding:
+            response.set_data(compress(body, encoding))
+            response.headers['Content-Encoding'] = encoding
+
+    return response
+
+def is_compact(data=None):
+    """Whether the client asked for the compact response format"""
+    fmt = request.args.get('format') or (data or {}).get('format')
+    return fmt == 'compact'
@@ -3,8 +3,31 @@ Quick test script for ML API endpoints
 """
 import requests
 import json
+import time
 
 BASE_URL = "http://localhost:5001"
+JOB_TIMEOUT = 60
+
+YIELD_SAMPLE = {
+    "Year": 2024,
+    "Area_ha": 120.0,
+    "N_req_kg_per_ha": 110.0,
+    "P_req_kg_per_ha": 45.0,
+    "K_req_kg_per_ha": 40.0,
+    "Temperature_C": 25.5,
+    "Humidity_%": 78.0,
+    "pH": 6.5,
+    "Rainfall_mm": 1200.0,
+    "Crop": "Rice",
+    "State Name": "Punjab"
+}
+
+def check_interval(result):
+    """Whether a yield result has a std and an interval around the yield"""
+    if 'std' not in result or 'model' not in result or 'interval' not in result:
+        return False
+    interval = result['interval']
+    return interval['lower'] <= result['yield'] <= interval['upper']
 
 def test_health():
     """Test health endpoint"""
@@ -23,14 +46,7 @@ def test_yield_prediction():
     print("Testing Yield Prediction")
     print("="*60)
     
-    data = {
-        "Area": "India",
-        "Item": "Rice",
-        "Year": 2024,
-        "average_rain_fall_mm_per_year": 1200,
-        "pesticides_tonnes": 50,
-        "avg_temp": 25.5
-    }
+    data = YIELD_SAMPLE
     
     print(f"Input: {json.dumps(data, indent=2)}")
     
@@ -41,7 +57,36 @@ def test_yield_prediction():
     
     print(f"Status Code: {response.status_code}")
     print(f"Response: {json.dumps(response.json(), indent=2)}")
-    return response.status_code == 200
+    return response.status_code == 200 and check_interval(response.json()['prediction'])
+
+def test_batch_yield_prediction():
+    """Test batch yield prediction endpoint"""
+    print("\n" + "="*60)
+    print("Testing Batch Yield Prediction")
+    print("="*60)
+    
+    data = {
+        "samples": [
+            YIELD_SAMPLE,
+            {**YIELD_SAMPLE, "Crop": "Wheat", "State Name": "Bihar", "Rainfall_mm": 650.0}
+        ]
+    }
+    
+    print(f"Input: {len(data['samples'])} samples")
+    
+    response = requests.post(
+        f"{BASE_URL}/api/ml/batch-predict-yield",
+        json=data
+    )
+    
+    print(f"Status Code: {response.status_code}")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    results = response.json().get('results', [])
+    return (
+        response.status_code == 200
+        and len(results) == len(data['samples'])
+        and all(check_interval(result) for result in results)
+    )
 
 def test_crop_recommendation():
     """Test crop recommendation endpoint"""
@@ -102,6 +147,115 @@ def test_batch_recommendation():
     print(f"Response: {json.dumps(response.json(), indent=2)}")
     return response.status_code == 200
 
+def test_sweep():
+    """Test what-if sweep endpoint"""
+    print("\n" + "="*60)
+    print("Testing What-if Sweep")
+    print("="*60)
+    
+    data = {
+        "model": "crop",
+        "base": {
+            "N": 90, "P": 42, "K": 43,
+            "temperature": 20.87, "humidity": 82.00,
+            "ph": 6.50, "rainfall": 202.93
+        },
+        "sweep": [
+            {"feature": "rainfall", "start": 50, "stop": 300, "steps": 100},
+            {"feature": "N", "start": 0, "stop": 140, "steps": 100}
+        ]
+    }
+    
+    print(f"Input: {[spec['feature'] for spec in data['sweep']]} sweep")
+    
+    response = requests.post(
+        f"{BASE_URL}/api/ml/sweep",
+        json=data
+    )
+    
+    print(f"Status Code: {response.status_code}")
+    print(f"Grid Size: {response.json().get('grid_size')}")
+    print(f"Elapsed: {response.elapsed.total_seconds() * 1000:.1f} ms")
+    return response.status_code == 200
+
+def test_models():
+    """Test yield model registry endpoint"""
+    print("\n" + "="*60)
+    print("Testing Model Registry")
+    print("="*60)
+    
+    response = requests.get(f"{BASE_URL}/api/ml/models")
+    
+    print(f"Status Code: {response.status_code}")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    report = response.json()
+    return (
+        response.status_code == 200
+        and report.get('registered', 0) > 0
+        and len(report.get('resident', [])) <= report['registered']
+    )
+
+def test_drift():
+    """Test input drift endpoint"""
+    print("\n" + "="*60)
+    print("Testing Drift Monitoring")
+    print("="*60)
+    
+    response = requests.get(f"{BASE_URL}/api/ml/drift")
+    
+    print(f"Status Code: {response.status_code}")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    # PSI is withheld (insufficient_data) while a feature has fewer than min_rows values
+    features = [
+        entry
+        for report in response.json().values()
+        for entries in (report['numeric'], report['categorical'])
+        for entry in entries.values()
+    ]
+    return response.status_code == 200 and all(
+        (entry['psi'] is None) == (entry['status'] == 'insufficient_data')
+        and (entry['psi'] is not None or entry['count'] < entry['min_rows'])
+        for entry in features
+    )
+
+def test_bulk_job():
+    """Test bulk job endpoints: submit, poll and download"""
+    print("\n" + "="*60)
+    print("Testing Bulk Job")
+    print("="*60)
+    
+    data = {"type": "predict-yield", "samples": [YIELD_SAMPLE] * 25}
+    
+    print(f"Input: {data['type']} job of {len(data['samples'])} samples")
+    
+    response = requests.post(
+        f"{BASE_URL}/api/ml/jobs",
+        json=data
+    )
+    
+    print(f"Status Code: {response.status_code}")
+    if response.status_code != 202:
+        print(f"Response: {json.dumps(response.json(), indent=2)}")
+        return False
+    job = response.json()
+    
+    deadline = time.time() + JOB_TIMEOUT
+    status = job['status']
+    while status['state'] in ('queued', 'running') and time.time() < deadline:
+        time.sleep(0.5)
+        status = requests.get(f"{BASE_URL}{job['status_url']}").json()
+    print(f"Job Status: {json.dumps(status, indent=2)}")
+    if status['state'] != 'succeeded':
+        return False
+    
+    response = requests.get(f"{BASE_URL}{job['results_url']}")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    print(f"Results: {len(rows)} rows, first: {rows[0] if rows else None}")
+    return (
+        response.status_code == 200
+        and [row['row'] for row in rows] == list(range(len(data['samples'])))
+    )
+
 if __name__ == "__main__":
     print("\n" + "="*60)
     print("FarmChain ML Service API Tests")
@@ -110,8 +264,13 @@ if __name__ == "__main__":
     results = {
         "Health Check": test_health(),
         "Yield Prediction": test_yield_prediction(),
+        "Batch Yield Prediction": test_batch_yield_prediction(),
         "Crop Recommendation": test_crop_recommendation(),
-        "Batch Recommendation": test_batch_recommendation()
+        "Batch Recommendation": test_batch_recommendation(),
+        "What-if Sweep": test_sweep(),
+        "Model Registry": test_models(),
+        "Drift Monitoring": test_drift(),
+        "Bulk Job": test_bulk_job()
     }
     
     print("\n" + "="*60)
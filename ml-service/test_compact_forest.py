@@ -0,0 +1,85 @@
+"""
+Tests for the compact forest export (no trained models needed)
+
+    python -m unittest test_compact_forest
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+from compact_forest import UINT8_SCALE, CompactForest
+
+def float32_features(rng, n=2000):
+    """
+    Float32 inputs in pairs of adjacent float32 values
+
+    A split between a pair has a float64 threshold that is not representable
+    in float32, and its nearest float32 rounds up to the upper value about
+    half the time, which is where a wrongly rounded threshold flips the split.
+    """
+    X = (rng.normal(size=(n // 2, 6)) * [1, 10, 100, 1e3, 0.01, 5]).astype(np.float32)
+    return np.concatenate([X, np.nextafter(X, np.float32(np.inf))])
+
+def sklearn_leaf_rows(model, X):
+    """leaf_values rows of the leaves sklearn reaches, in compact numbering"""
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    offsets = np.concatenate([[0], np.cumsum([tree.node_count for tree in trees])[:-1]])
+    is_leaf = np.concatenate([tree.feature for tree in trees]) < 0
+    leaf_rows = np.cumsum(is_leaf) - 1
+    return leaf_rows[model.apply(X) + offsets]
+
+class CompactForestTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        cls.X = float32_features(rng)
+        cls.X_test = float32_features(rng)
+        y = cls.X[:, 0] * 3 + np.sin(cls.X[:, 3] / 300) + rng.normal(scale=0.1, size=len(cls.X))
+        cls.regressor = RandomForestRegressor(n_estimators=30, random_state=0).fit(cls.X, y)
+        labels = np.digitize(cls.X[:, 1] + cls.X[:, 4] * 500, [-10, 0, 10])
+        cls.classifier = RandomForestClassifier(n_estimators=30, max_depth=8, random_state=0).fit(
+            cls.X, np.array(['a', 'b', 'c', 'd'])[labels]
+        )
+
+    def test_apply_matches_sklearn(self):
+        for model in (self.regressor, self.classifier):
+            compact = CompactForest.from_sklearn(model)
+            for X in (self.X, self.X_test):
+                np.testing.assert_array_equal(compact.apply(X), sklearn_leaf_rows(model, X))
+
+    def test_regressor_predictions(self):
+        compact = CompactForest.from_sklearn(self.regressor)
+        np.testing.assert_allclose(
+            compact.predict_trees(self.X_test).mean(axis=1), self.regressor.predict(self.X_test),
+            rtol=1e-6, atol=1e-5
+        )
+        np.testing.assert_allclose(
+            compact.predict(self.X_test), self.regressor.predict(self.X_test), rtol=1e-6, atol=1e-5
+        )
+
+    def test_classifier_probabilities(self):
+        expected = self.classifier.predict_proba(self.X_test)
+        for proba_dtype in ('uint8', 'float16'):
+            compact = CompactForest.from_sklearn(self.classifier, proba_dtype=proba_dtype)
+            proba = compact.predict_proba(self.X_test)
+            self.assertLessEqual(np.abs(proba - expected).max(), 1 / UINT8_SCALE)
+            self.assertEqual(list(compact.classes_), list(self.classifier.classes_))
+
+    def test_save_load(self):
+        compact = CompactForest.from_sklearn(self.classifier)
+        fd, path = tempfile.mkstemp(suffix='.npz')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        compact.save(path)
+        loaded = CompactForest.load(path)
+        np.testing.assert_array_equal(
+            loaded.predict_proba(self.X_test), compact.predict_proba(self.X_test)
+        )
+        np.testing.assert_array_equal(loaded.predict(self.X_test), compact.predict(self.X_test))
+
+if __name__ == '__main__':
+    unittest.main()
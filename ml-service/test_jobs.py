@@ -0,0 +1,185 @@
+"""
+Tests for the bulk job queue (no models or running service needed)
+
+    python -m unittest test_jobs
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import pandas as pd
+
+import jobs
+
+TIMEOUT = 10
+
+class GatedScorer:
+    """Scorer that blocks in each chunk until released"""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, chunk):
+        self.entered.set()
+        self.release.wait(TIMEOUT)
+        return pd.DataFrame({'value': chunk['x'] * 2})
+
+def double(chunk):
+    return pd.DataFrame({'value': chunk['x'] * 2})
+
+def fail(chunk):
+    raise ValueError('bad chunk')
+
+class JobManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.gated = GatedScorer()
+        self.addCleanup(self.gated.release.set)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def manager(self, cls=jobs.JobManager, workers=1, **kwargs):
+        return cls(
+            {'gated': self.gated, 'double': double, 'fail': fail},
+            directory=self.directory, workers=workers, chunk_rows=2, **kwargs
+        )
+
+    def wait_for(self, manager, job_id, states):
+        deadline = time.time() + TIMEOUT
+        while time.time() < deadline:
+            status = manager.status(job_id)
+            if status is not None and status['state'] in states:
+                return status
+            time.sleep(0.01)
+        self.fail(f'job {job_id} never reached {states}: {manager.status(job_id)}')
+
+    def wait_idle(self, manager, job_id):
+        deadline = time.time() + TIMEOUT
+        while job_id in manager._active and time.time() < deadline:
+            time.sleep(0.01)
+
+    def assert_worker_alive(self, manager):
+        job_id = manager.submit('double', pd.DataFrame({'x': [1, 2, 3]}))['job_id']
+        self.wait_for(manager, job_id, [jobs.SUCCEEDED])
+        with open(manager.results_path(job_id)) as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_succeeds(self):
+        manager = self.manager()
+        self.assert_worker_alive(manager)
+
+    def test_cancel_running_job(self):
+        manager = self.manager()
+        job_id = manager.submit('gated', pd.DataFrame({'x': [1, 2, 3]}))['job_id']
+        self.assertTrue(self.gated.entered.wait(TIMEOUT))
+
+        self.assertEqual(manager.cancel(job_id)['state'], jobs.CANCELLED)
+        self.gated.release.set()
+        self.wait_idle(manager, job_id)
+
+        self.assertEqual(manager.status(job_id)['state'], jobs.CANCELLED)
+        self.assert_worker_alive(manager)
+
+    def test_delete_running_job(self):
+        manager = self.manager()
+        job_id = manager.submit('gated', pd.DataFrame({'x': [1, 2, 3]}))['job_id']
+        self.assertTrue(self.gated.entered.wait(TIMEOUT))
+
+        manager.cancel(job_id)
+        # The worker is still in its chunk, so the files are kept for now
+        self.assertEqual(manager.delete(job_id)['state'], jobs.CANCELLED)
+        self.assertIsNotNone(manager.status(job_id))
+
+        self.gated.release.set()
+        self.wait_idle(manager, job_id)
+        manager.delete(job_id)
+        self.assertIsNone(manager.status(job_id))
+        self.assert_worker_alive(manager)
+
+    def test_removed_job_does_not_kill_worker(self):
+        manager = self.manager()
+        job_id = manager.submit('gated', pd.DataFrame({'x': [1, 2, 3]}))['job_id']
+        self.assertTrue(self.gated.entered.wait(TIMEOUT))
+
+        # Removed behind the manager's back, e.g. by another process
+        shutil.rmtree(os.path.join(self.directory, job_id))
+        self.gated.release.set()
+        self.wait_idle(manager, job_id)
+
+        self.assertIsNone(manager.status(job_id))
+        self.assert_worker_alive(manager)
+
+    def test_prune_skips_active_job(self):
+        manager = self.manager(keep=0)
+        job_id = manager.submit('gated', pd.DataFrame({'x': [1, 2, 3]}))['job_id']
+        self.assertTrue(self.gated.entered.wait(TIMEOUT))
+
+        manager.cancel(job_id)
+        manager._prune()
+        self.assertIsNotNone(manager.status(job_id))
+
+        self.gated.release.set()
+        self.wait_idle(manager, job_id)
+        self.assert_worker_alive(manager)
+
+    def test_cancel_before_final_transition(self):
+        class CancelAtFinish(jobs.JobManager):
+            def _update(self, job_id, **changes):
+                if changes.get('state') == jobs.SUCCEEDED:
+                    self.cancel(job_id)
+                return super()._update(job_id, **changes)
+
+        manager = self.manager(cls=CancelAtFinish)
+        job_id = manager.submit('double', pd.DataFrame({'x': [1, 2, 3]}))['job_id']
+        self.wait_for(manager, job_id, jobs.FINISHED)
+        self.wait_idle(manager, job_id)
+        self.assertEqual(manager.status(job_id)['state'], jobs.CANCELLED)
+
+    def test_recovers_jobs_after_restart(self):
+        # A previous process with no workers left these jobs behind
+        previous = self.manager(workers=0)
+        frame = pd.DataFrame({'x': [1, 2, 3]})
+        queued = previous.submit('double', frame)['job_id']
+        running = previous.submit('double', frame)['job_id']
+        previous._write_status(running, {**previous.status(running), 'state': jobs.RUNNING})
+        # Queued by a sibling process that is still alive
+        sibling = previous.submit('double', frame)['job_id']
+        previous._write_status(sibling, {
+            **previous.status(sibling), 'owner': {**jobs._owner(), 'pid': os.getppid()}
+        })
+
+        manager = self.manager()
+        self.wait_for(manager, queued, [jobs.SUCCEEDED])
+        with open(manager.results_path(queued)) as f:
+            self.assertEqual(len(f.readlines()), 3)
+        status = manager.status(running)
+        self.assertEqual(status['state'], jobs.FAILED)
+        self.assertEqual(status['error'], 'Service restarted while the job was running')
+        self.assertFalse(os.path.exists(os.path.join(self.directory, running, jobs.INPUT_FILE)))
+        self.assertEqual(manager.status(sibling)['state'], jobs.QUEUED)
+
+    def test_recovery_with_full_queue(self):
+        previous = self.manager(workers=0)
+        job_ids = [previous.submit('double', pd.DataFrame({'x': [i]}))['job_id'] for i in range(3)]
+
+        manager = self.manager(backend=jobs.LocalQueue(maxsize=2))
+        states = [self.wait_for(manager, job_id, jobs.FINISHED)['state'] for job_id in job_ids]
+        # Only two fit back on the queue; the third fails instead of being lost
+        self.assertEqual(sorted(states), [jobs.FAILED, jobs.SUCCEEDED, jobs.SUCCEEDED])
+        failed = [manager.status(job_id) for job_id, state in zip(job_ids, states)
+                  if state == jobs.FAILED]
+        self.assertEqual(failed[0]['error'], 'Job queue was full when the service restarted')
+
+    def test_failing_job(self):
+        manager = self.manager()
+        job_id = manager.submit('fail', pd.DataFrame({'x': [1]}))['job_id']
+        status = self.wait_for(manager, job_id, [jobs.FAILED])
+        self.assertEqual(status['error'], 'bad chunk')
+        self.assert_worker_alive(manager)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests for the interpretation rules engine (no models or running service needed)
+
+    python -m unittest test_rules
+"""
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import rules
+
+# Scalar interpretation chains the rule tables replaced
+
+def legacy_yield_interpretation(yield_value):
+    if yield_value > 50000:
+        return "Excellent yield expected"
+    elif yield_value > 30000:
+        return "Good yield expected"
+    elif yield_value > 15000:
+        return "Average yield expected"
+    else:
+        return "Below average yield expected"
+
+def legacy_suitability_level(confidence):
+    if confidence > 0.8:
+        return "Highly Suitable"
+    elif confidence > 0.6:
+        return "Suitable"
+    elif confidence > 0.4:
+        return "Moderately Suitable"
+    else:
+        return "Less Suitable"
+
+def legacy_soil_conditions(data):
+    analysis = {
+        'nitrogen': 'Optimal' if 20 <= data.get('N', 0) <= 100 else 'Needs adjustment',
+        'phosphorus': 'Optimal' if 10 <= data.get('P', 0) <= 80 else 'Needs adjustment',
+        'potassium': 'Optimal' if 10 <= data.get('K', 0) <= 60 else 'Needs adjustment',
+        'ph': 'Optimal' if 5.5 <= data.get('ph', 0) <= 7.5 else 'Needs adjustment',
+        'overall': 'Good'
+    }
+    adjustments_needed = sum(1 for v in analysis.values() if v == 'Needs adjustment')
+    if adjustments_needed >= 3:
+        analysis['overall'] = 'Poor - Multiple adjustments needed'
+    elif adjustments_needed >= 2:
+        analysis['overall'] = 'Fair - Some adjustments needed'
+    return analysis
+
+def around(*points, eps=1e-6):
+    """Each point with its neighbours just below and above"""
+    return [v for p in points for v in (p - eps, p, p + eps)]
+
+def soil_labels(rule_sets, frame, crops=None, regions=None):
+    """Per-row soil analysis dicts from the rules engine"""
+    names, codes, overall = rules.analyze_soil(rule_sets, frame, crops, regions)
+    labels = rules.expand(rule_sets, 'soil', codes)
+    overall = rules.expand(rule_sets, 'soil_overall', overall)
+    return [
+        {**dict(zip(names, row)), 'overall': row_overall}
+        for row, row_overall in zip(labels, overall)
+    ]
+
+class RulesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rule_sets = rules.load_rules()
+
+    def load_overrides(self, overrides):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(overrides, f)
+        return rules.load_rules(path)
+
+    def test_yield_boundaries(self):
+        values = [-1, 0] + around(15000, 30000, 50000) + [1e9]
+        codes = rules.classify(self.rule_sets, 'yield', values)
+        self.assertEqual(
+            list(rules.expand(self.rule_sets, 'yield', codes)),
+            [legacy_yield_interpretation(v) for v in values]
+        )
+
+    def test_suitability_boundaries(self):
+        values = [0.0, 1.0] + around(0.4, 0.6, 0.8)
+        codes = rules.classify(self.rule_sets, 'suitability', values)
+        self.assertEqual(
+            list(rules.expand(self.rule_sets, 'suitability', codes)),
+            [legacy_suitability_level(v) for v in values]
+        )
+
+    def test_soil_boundaries(self):
+        edges = {'N': (20, 100), 'P': (10, 80), 'K': (10, 60), 'ph': (5.5, 7.5)}
+        inside = {feature: (low + high) / 2 for feature, (low, high) in edges.items()}
+        samples = [inside, {}]
+        for feature, (low, high) in edges.items():
+            samples += [{**inside, feature: v} for v in around(low, high)]
+        # Every number of readings needing adjustment, for the overall label
+        features = list(edges)
+        for count in range(len(features) + 1):
+            samples.append({**inside, **{f: edges[f][1] + 1 for f in features[:count]}})
+
+        self.assertEqual(
+            soil_labels(self.rule_sets, pd.DataFrame(samples)),
+            [legacy_soil_conditions(sample) for sample in samples]
+        )
+
+    def test_overrides(self):
+        rule_sets = self.load_overrides({
+            'crop:rice': {'soil': {'ranges': {'nitrogen': {'range': [60, 120]}}}},
+            'region:Punjab': {'yield': {'bins': [20000, 40000, 60000]}}
+        })
+
+        codes = rules.classify(
+            rule_sets, 'yield', [18000, 18000, 18000],
+            crops=['rice', 'wheat', 'wheat'], regions=['Bihar', 'Punjab', None]
+        )
+        self.assertEqual(list(rules.expand(rule_sets, 'yield', codes)), [
+            'Average yield expected', 'Below average yield expected', 'Average yield expected'
+        ])
+
+        frame = pd.DataFrame([{'N': 40, 'P': 40, 'K': 40, 'ph': 6.5}] * 2)
+        analysis = soil_labels(rule_sets, frame, crops=['rice', 'maize'])
+        self.assertEqual(analysis[0]['nitrogen'], 'Needs adjustment')
+        self.assertEqual(analysis[1]['nitrogen'], 'Optimal')
+
+    def test_rejected_overrides(self):
+        for override in (
+            {'crop:rice': {'yield': {'labels': ['a', 'b', 'c', 'd']}}},
+            {'crop:rice': {'soil': {'ranges': {'nitrogen': {'feature': 'K'}}}}},
+            {'crop:rice': {'yield': {'cutoffs': [1, 2, 3]}}},
+            {'rice': {'yield': {'bins': [1, 2, 3]}}}
+        ):
+            with self.assertRaises(ValueError):
+                self.load_overrides(override)
+
+if __name__ == '__main__':
+    unittest.main()
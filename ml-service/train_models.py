@@ -5,42 +5,68 @@ import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.metrics import mean_squared_error, r2_score, accuracy_score, classification_report
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import mean_squared_error, r2_score, accuracy_score
 # import xgboost as xgb  # Optional - using RandomForest instead
 import joblib
+import argparse
 import os
 
+import dataset
+import drift
+import evaluation
+from model_registry import REGISTRY_DIR, model_key, save_bundle, write_manifest
+
+# Smallest group of rows worth a specialised region/crop yield model
+MIN_REGIONAL_ROWS = 500
+
+# Hyperparameters of the primary models
+YIELD_MODEL_PARAMS = {
+    'n_estimators': 200,
+    'max_depth': 15,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'random_state': 42,
+    'n_jobs': -1
+}
+
+CROP_MODEL_PARAMS = {
+    'n_estimators': 200,
+    'max_depth': 15,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'random_state': 42,
+    'n_jobs': -1
+}
+
+# Regional models are many and each fits a slice of the rows, so use fewer trees
+REGIONAL_YIELD_MODEL_PARAMS = {**YIELD_MODEL_PARAMS, 'n_estimators': 100}
+
+YIELD_FEATURES = ['Year', 'Area_ha', 'N_req_kg_per_ha', 'P_req_kg_per_ha',
+                  'K_req_kg_per_ha', 'Temperature_C', 'Humidity_%', 'pH',
+                  'Rainfall_mm', 'Crop', 'State Name']
+
 def train_yield_prediction_model():
     """Train crop yield prediction model using Custom_Crops_yield_Historical_Dataset.csv"""
     print("Training Crop Yield Prediction Model...")
     
-    # Load dataset
-    df = pd.read_csv('../Custom_Crops_yield_Historical_Dataset.csv')
+    # Load dataset snapshot (rows with missing values are dropped when it is built)
+    data = dataset.load_dataset(dataset.YIELD_DATASET, dataset.YIELD_SCHEMA)
     
-    print(f"Dataset loaded: {df.shape[0]} rows, {df.shape[1]} columns")
+    print(f"Dataset loaded: {data['rows']} rows, {len(data['columns'])} columns")
     
     # Select relevant features for prediction
-    feature_cols = ['Year', 'Area_ha', 'N_req_kg_per_ha', 'P_req_kg_per_ha', 
-                    'K_req_kg_per_ha', 'Temperature_C', 'Humidity_%', 'pH', 
-                    'Rainfall_mm', 'Crop', 'State Name']
+    feature_cols = YIELD_FEATURES
     
     # Target variable
     target_col = 'Yield_kg_per_ha'
     
-    # Drop rows with missing values
-    df = df.dropna(subset=feature_cols + [target_col])
-    
     # Feature engineering
-    X = df[feature_cols].copy()
-    y = df[target_col]
+    X = dataset.to_frame(data, feature_cols, codes=True)
+    y = data['columns'][target_col]
     
-    # Encode categorical variables if any
-    label_encoders = {}
-    for column in X.select_dtypes(include=['object']).columns:
-        le = LabelEncoder()
-        X[column] = le.fit_transform(X[column])
-        label_encoders[column] = le
+    # Categorical variables are stored as label-encoded codes
+    label_encoders = dataset.label_encoders(data, data['categories'])
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -52,14 +78,7 @@ def train_yield_prediction_model():
     
     # Train Random Forest (primary model)
     print("Training Random Forest Regressor...")
-    rf_model = RandomForestRegressor(
-        n_estimators=200,
-        max_depth=15,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        random_state=42,
-        n_jobs=-1
-    )
+    rf_model = RandomForestRegressor(**YIELD_MODEL_PARAMS)
     rf_model.fit(X_train_scaled, y_train)
     
     # Evaluate RF
@@ -84,19 +103,78 @@ def train_yield_prediction_model():
     joblib.dump(label_encoders, 'models/yield_label_encoders.pkl')
     joblib.dump(list(X.columns), 'models/yield_feature_names.pkl')
     
+    # Save the input distribution reference used for drift monitoring
+    categorical_cols = list(label_encoders)
+    reference = drift.build_reference(
+        dataset.to_frame(data, feature_cols),
+        [c for c in feature_cols if c not in categorical_cols],
+        categorical_cols
+    )
+    drift.save_reference(reference, 'models', 'yield')
+    
     print("Yield prediction model saved successfully!")
     return best_model, scaler, label_encoders
 
+def train_regional_yield_models(min_rows=MIN_REGIONAL_ROWS, registry_dir=REGISTRY_DIR):
+    """Train specialised yield models per state/crop pair and per crop"""
+    print("\nTraining Regional Yield Prediction Models...")
+    
+    data = dataset.load_dataset(dataset.YIELD_DATASET, dataset.YIELD_SCHEMA)
+    target_col = 'Yield_kg_per_ha'
+    feature_cols = ['Year', 'Area_ha', 'N_req_kg_per_ha', 'P_req_kg_per_ha',
+                    'K_req_kg_per_ha', 'Temperature_C', 'Humidity_%', 'pH',
+                    'Rainfall_mm']
+    groups = dataset.to_frame(data, ['State Name', 'Crop'])
+    X_all = dataset.to_frame(data, feature_cols)
+    y_all = data['columns'][target_col]
+    
+    # Specialised models drop the region/crop columns they are keyed by
+    slices = {}
+    for crop, index in groups.groupby('Crop', observed=True).indices.items():
+        slices[model_key(crop=crop)] = index
+    for (state, crop), index in groups.groupby(['State Name', 'Crop'], observed=True).indices.items():
+        slices[model_key(region=state, crop=crop)] = index
+    
+    entries = {}
+    for key, index in slices.items():
+        if len(index) < min_rows:
+            continue
+        
+        X = X_all.iloc[index]
+        y = y_all[index]
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+        
+        model = RandomForestRegressor(**REGIONAL_YIELD_MODEL_PARAMS)
+        model.fit(X_train_scaled, y_train)
+        r2 = r2_score(y_test, model.predict(X_test_scaled))
+        
+        bundle = {
+            'model': model,
+            'scaler': scaler,
+            'label_encoders': {},
+            'features': feature_cols
+        }
+        entries[key] = save_bundle(registry_dir, key, bundle, rows=len(index), r2=float(r2))
+        print(f"{key}: {len(index)} rows, R² {r2:.4f}")
+    
+    write_manifest(registry_dir, entries)
+    print(f"{len(entries)} regional yield models saved to {registry_dir}")
+    return entries
+
 def train_crop_recommendation_model():
     """Train crop recommendation model using Crop_recommendation.csv"""
     print("\nTraining Crop Recommendation Model...")
     
-    # Load dataset
-    df = pd.read_csv('../Crop_recommendation.csv')
+    # Load dataset snapshot
+    data = dataset.load_dataset(dataset.CROP_DATASET, dataset.CROP_SCHEMA)
     
     # Features and target
-    X = df.drop(['label'], axis=1)
-    y = df['label']
+    X = dataset.to_frame(data, [c for c in dataset.CROP_SCHEMA if c != 'label'])
+    y = dataset.to_frame(data, ['label'])['label'].astype(str)
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
@@ -108,14 +186,7 @@ def train_crop_recommendation_model():
     
     # Train Random Forest Classifier (primary model)
     print("Training Random Forest Classifier...")
-    rf_model = RandomForestClassifier(
-        n_estimators=200,
-        max_depth=15,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        random_state=42,
-        n_jobs=-1
-    )
+    rf_model = RandomForestClassifier(**CROP_MODEL_PARAMS)
     rf_model.fit(X_train_scaled, y_train)
     
     # Evaluate RF
@@ -146,18 +217,67 @@ def train_crop_recommendation_model():
     joblib.dump(scaler, 'models/crop_recommendation_scaler.pkl')
     joblib.dump(list(X.columns), 'models/crop_recommendation_features.pkl')
     joblib.dump(list(y.unique()), 'models/crop_labels.pkl')
+    drift.save_reference(drift.build_reference(X, list(X.columns), []), 'models', 'crop')
     
     print("Crop recommendation model saved successfully!")
     return best_model, scaler
 
+def evaluate_models(folds=evaluation.DEFAULT_FOLDS, workers=None):
+    """K-fold evaluation of the model candidates and the saved artifacts"""
+    print("\nEvaluating Models...")
+    
+    configs = {
+        'yield': {
+            'data': dataset.load_dataset(dataset.YIELD_DATASET, dataset.YIELD_SCHEMA),
+            'features': YIELD_FEATURES,
+            'target': 'Yield_kg_per_ha',
+            'classifier': False,
+            'slices': ['Crop', 'State Name'],
+            'artifact': 'yield_prediction_model',
+            'scaler': 'yield_scaler.pkl',
+            'candidates': {'RandomForest': (RandomForestRegressor, YIELD_MODEL_PARAMS)}
+        },
+        'crop': {
+            'data': dataset.load_dataset(dataset.CROP_DATASET, dataset.CROP_SCHEMA),
+            'features': [c for c in dataset.CROP_SCHEMA if c != 'label'],
+            'target': 'label',
+            'classifier': True,
+            'slices': [],
+            'artifact': 'crop_recommendation_model',
+            'scaler': 'crop_recommendation_scaler.pkl',
+            'candidates': {'RandomForest': (RandomForestClassifier, CROP_MODEL_PARAMS)}
+        }
+    }
+    return evaluation.evaluate(configs, folds=folds, workers=workers)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train FarmChain ML models')
+    parser.add_argument('--regional', action='store_true',
+                        help='also train per-state/per-crop yield models')
+    parser.add_argument('--min-rows', type=int, default=MIN_REGIONAL_ROWS,
+                        help='minimum rows for a regional yield model')
+    parser.add_argument('--evaluate', action='store_true',
+                        help='run k-fold evaluation and write models/evaluation_report.json')
+    parser.add_argument('--evaluate-only', action='store_true',
+                        help='evaluate the saved models without retraining them')
+    parser.add_argument('--folds', type=int, default=evaluation.DEFAULT_FOLDS,
+                        help='number of evaluation folds')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='evaluation worker processes (default: CPU count)')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("FarmChain ML Model Training")
     print("=" * 60)
     
     # Train both models
-    yield_model, yield_scaler, yield_encoders = train_yield_prediction_model()
-    crop_model, crop_scaler = train_crop_recommendation_model()
+    if not args.evaluate_only:
+        yield_model, yield_scaler, yield_encoders = train_yield_prediction_model()
+        crop_model, crop_scaler = train_crop_recommendation_model()
+        if args.regional:
+            train_regional_yield_models(min_rows=args.min_rows)
+    if args.evaluate or args.evaluate_only:
+        evaluate_models(folds=args.folds, workers=args.workers)
     
     print("\n" + "=" * 60)
     print("Training Complete! Models saved in 'models/' directory")